@@ -0,0 +1,154 @@
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from functools import partial
+from types import MappingProxyType
+from typing import Callable, Dict, List, Mapping
+import numpy as np
+from budget_advisor import DEFAULT_BUDGETS, BudgetAdvisor
+from expense_store import SQLiteExpenseStore
+from forecast import daily_spend, days_in_month, forecast_month_end, month_to_date
+
+
+class AdvisorManager:
+    """Hosts many users' advisors in one process.
+
+    Every user's ledger and budgets live in one shared SQLite database,
+    so an advisor in memory is only a cache: the LRU keeps at most
+    `max_active` of them and evicting one just drops it. The next request
+    for that user rehydrates it, which costs one GROUP BY query to rebuild
+    its rollup cube. All advisors share the category vocabulary and the
+    default budgets until a user changes their own.
+
+    There is never more than one advisor per user: an evicted advisor that
+    a request still holds is remembered weakly and handed out again
+    instead of rehydrating a second copy whose rollup would drift apart.
+    """
+
+    def __init__(self, path: str = ":memory:", max_active: int = 1000,
+                 default_budgets: Mapping[str, float] = None):
+        self.store = SQLiteExpenseStore(path, user_id="")
+        self.max_active = max_active
+        self.default_budgets = MappingProxyType(dict(default_budgets or DEFAULT_BUDGETS))
+        self.categories = tuple(self.default_budgets)
+        self._lock = threading.Lock()
+        self._active: "OrderedDict[str, BudgetAdvisor]" = OrderedDict()
+        self._last_used: Dict[str, float] = {}
+        # Evicted advisors still referenced elsewhere, e.g. by an in-flight request
+        self._evicted: "weakref.WeakValueDictionary[str, BudgetAdvisor]" = weakref.WeakValueDictionary()
+        self._alert_callbacks: List[Callable[[str, Dict], None]] = []
+        self.hits = 0
+        self.rehydrations = 0
+        self.revivals = 0
+        self.evictions = 0
+
+    def get(self, user_id: str) -> BudgetAdvisor:
+        with self._lock:
+            advisor = self._active.get(user_id)
+            if advisor is not None:
+                self._active.move_to_end(user_id)
+                self.hits += 1
+            else:
+                advisor = self._evicted.pop(user_id, None)
+                if advisor is not None:
+                    self.revivals += 1
+                else:
+                    advisor = BudgetAdvisor(self.store.for_user(user_id), shared_budgets=self.default_budgets,
+                                            categories=self.categories)
+                    for callback in self._alert_callbacks:
+                        advisor.on_alert(partial(callback, user_id))
+                    self.rehydrations += 1
+                self._active[user_id] = advisor
+                while len(self._active) > self.max_active:
+                    self._evict(next(iter(self._active)))
+            self._last_used[user_id] = time.monotonic()
+            return advisor
+
+    def on_alert(self, callback: Callable[[str, Dict], None]):
+        """Call `callback(user_id, event)` for every user's budget alerts (see BudgetAdvisor.on_alert)."""
+        with self._lock:
+            self._alert_callbacks.append(callback)
+            for user_id, advisor in [*self._active.items(), *self._evicted.items()]:
+                advisor.on_alert(partial(callback, user_id))
+
+    def __getitem__(self, user_id: str) -> BudgetAdvisor:
+        return self.get(user_id)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._active
+
+    def __len__(self) -> int:
+        return len(self._active)
+
+    def _evict(self, user_id: str):
+        # Writes already went through to SQLite, so there is nothing to flush
+        self._evicted[user_id] = self._active.pop(user_id)
+        del self._last_used[user_id]
+        self.evictions += 1
+
+    def evict(self, user_id: str) -> bool:
+        with self._lock:
+            if user_id not in self._active:
+                return False
+            self._evict(user_id)
+            return True
+
+    def evict_idle(self, max_idle_seconds: float) -> int:
+        cutoff = time.monotonic() - max_idle_seconds
+        with self._lock:
+            idle = [user_id for user_id in self._active if self._last_used[user_id] < cutoff]
+            for user_id in idle:
+                self._evict(user_id)
+        return len(idle)
+
+    def forecast(self, month: str = None, day: int = None) -> Dict:
+        """Project month-end spending for every user in the database at once.
+
+        One GROUP BY query fills a users x categories x days float32 array
+        (about 1.1 KB per user with spending this month), scored by a single
+        vectorized forecast_month_end call. Users without expenses this
+        month are left out; "users" gives each row's user id.
+        """
+        month, day = month_to_date(month, day)
+        rows = self.store.daily_totals_by_user(month)
+        users, categories, days, totals = (np.array(column) for column in zip(*rows)) if rows else ([],) * 4
+        user_ids, user_codes = np.unique(np.asarray(users, dtype=str), return_inverse=True)
+        names, name_codes = np.unique(np.asarray(categories, dtype=str), return_inverse=True)
+        columns = np.array([self.categories.index(name) if name in self.categories else -1 for name in names],
+                           dtype=np.int64)[name_codes]
+        known = columns >= 0
+        shape = (len(user_ids), len(self.categories), days_in_month(month))
+        daily = daily_spend((user_codes * shape[1] + columns)[known], np.asarray(days)[known],
+                            np.asarray(totals)[known], shape)
+
+        budgets = np.tile(np.array([self.default_budgets[c] for c in self.categories], dtype=np.float32),
+                          (len(user_ids), 1))
+        rows_by_user = {user_id: row for row, user_id in enumerate(user_ids.tolist())}
+        for user_id, category, amount in self.store.budgets_by_user():
+            if user_id in rows_by_user and category in self.categories:
+                budgets[rows_by_user[user_id], self.categories.index(category)] = amount
+
+        result = forecast_month_end(daily, day, budgets=budgets)
+        result.update({"month": month, "users": user_ids.tolist(), "categories": list(self.categories)})
+        return result
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.revivals + self.rehydrations
+            return {
+                "active": len(self._active),
+                "max_active": self.max_active,
+                "hits": self.hits,
+                "revivals": self.revivals,
+                "rehydrations": self.rehydrations,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+    def close(self):
+        with self._lock:
+            self._active.clear()
+            self._evicted.clear()
+            self._last_used.clear()
+        self.store.close()
@@ -0,0 +1,683 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List
+
+EXPENSE_MESSAGES = [
+    "I spent $25 on pizza delivery",
+    "Grabbed sushi with friends for $32",
+    "Paid $60 for my gym membership",
+    "Took a $18 ride home from the airport",
+    "$45 for concert tickets tonight",
+    "Picked up groceries, 82.50 dollars",
+    "New running shoes were $120",
+    "Dentist copay was $40",
+]
+
+
+def _latencies(fn: Callable, inputs: List, repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        for item in inputs:
+            start = time.perf_counter()
+            fn(item)
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _summarize(samples: List[float]) -> Dict:
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.mean(samples) * 1000,
+        "p50_ms": _percentile(samples, 50) * 1000,
+        "p95_ms": _percentile(samples, 95) * 1000
+    }
+
+
+def bench_combined(args) -> Dict:
+    from intent_classifier import IntentClassifier
+
+    # Rules off so both paths actually exercise the model
+    sequential = IntentClassifier(use_rules=False)
+    combined = IntentClassifier(use_rules=False, speculative_category=True)
+
+    mismatches = []
+    max_score_diff = 0.0
+    for message in EXPENSE_MESSAGES:
+        a = sequential.classify_intent(message)
+        b = combined.classify_intent(message)
+        if a[0] != b[0] or a[2].get("category") != b[2].get("category"):
+            mismatches.append({"message": message, "sequential": a[0:3:2], "combined": b[0:3:2]})
+        max_score_diff = max(max_score_diff, abs(a[1] - b[1]))
+
+    return {
+        "sequential": _summarize(_latencies(sequential.classify_intent, EXPENSE_MESSAGES, args.repeat)),
+        "combined": _summarize(_latencies(combined.classify_intent, EXPENSE_MESSAGES, args.repeat)),
+        "mismatches": mismatches,
+        "max_confidence_diff": max_score_diff
+    }
+
+
+def bench_batch(args) -> Dict:
+    from intent_classifier import IntentClassifier
+
+    classifier = IntentClassifier(use_rules=False)
+    messages = (EXPENSE_MESSAGES * (args.messages // len(EXPENSE_MESSAGES) + 1))[:args.messages]
+    reference = [classifier.classify_intent(message) for message in messages[:len(EXPENSE_MESSAGES)]]
+
+    results = {}
+    for batch_size in args.batch_sizes:
+        start = time.perf_counter()
+        batched = classifier.classify_batch(messages, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        results[batch_size] = {
+            "messages_per_sec": len(messages) / elapsed,
+            "labels_match": [r[0::2] for r in batched[:len(reference)]] == [r[0::2] for r in reference]
+        }
+    return results
+
+
+def bench_startup(args) -> Dict:
+    start = time.perf_counter()
+    from intent_classifier import IntentClassifier
+    from model_registry import get_registry
+    import_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    get_registry().get_pipeline()
+    model_load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    classifier = IntentClassifier()
+    construct = time.perf_counter() - start
+
+    # What the constructor used to pay up front, now deferred to first use
+    start = time.perf_counter()
+    sentences = len(classifier.financial_context)
+    context_first_access = time.perf_counter() - start
+
+    start = time.perf_counter()
+    IntentClassifier().financial_context.sentences("positive")
+    context_reopen = time.perf_counter() - start
+
+    return {
+        "import_s": import_time,
+        "model_load_s": model_load,
+        "classifier_init_s": construct,
+        "financial_context_first_access_s": context_first_access,
+        "financial_context_reopen_s": context_reopen,
+        "financial_context_sentences": sentences,
+        "eager_init_equivalent_s": construct + context_first_access
+    }
+
+
+# Cold-import budgets (cumulative ms under -X importtime) for the light entry
+# points, and the heavy packages none of them may pull in at import time.
+IMPORT_BUDGETS_MS = {"budget_advisor": 300, "chatbot": 600}
+HEAVY_MODULES = {"torch", "transformers", "datasets", "pandas", "plotly"}
+
+
+def _import_times(module: str) -> Dict[str, float]:
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr}")
+    times = {}
+    for line in proc.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative) / 1000
+    return times
+
+
+def bench_import_time(args) -> Dict:
+    report = {"modules": {}, "failures": []}
+    for module, budget in IMPORT_BUDGETS_MS.items():
+        runs = [_import_times(module) for _ in range(args.repeat)]
+        best = min(run[module] for run in runs)
+        heavy = sorted({name.split(".")[0] for name in runs[0]} & HEAVY_MODULES)
+        report["modules"][module] = {"cumulative_ms": best, "budget_ms": budget, "heavy_imports": heavy}
+        if best > budget:
+            report["failures"].append(f"import {module} took {best:.0f} ms (budget {budget} ms)")
+        if heavy:
+            report["failures"].append(f"import {module} pulls in {', '.join(heavy)}")
+    return report
+
+
+def synthetic_advisor(n: int, months: int = 12, seed: int = 0):
+    import numpy as np
+    from datetime import datetime
+    from budget_advisor import BudgetAdvisor
+
+    rng = np.random.default_rng(seed)
+    advisor = BudgetAdvisor()
+    categories = np.array(list(advisor.budgets))
+    descriptions = np.array(["coffee", "uber", "groceries", "netflix", "rent", "shoes", "flight"])
+    end = np.datetime64(datetime.now(), "us")
+    offsets = rng.uniform(0, months * 30 * 86400e6, n).astype("timedelta64[us]")
+    advisor.add_expenses(
+        np.round(rng.uniform(1, 200, n), 2),
+        descriptions[rng.integers(0, len(descriptions), n)].tolist(),
+        categories[rng.integers(0, len(categories), n)].tolist(),
+        end - offsets
+    )
+    return advisor
+
+
+def _dataframe_summary(advisor, month: str) -> Dict:
+    # The pre-aggregate implementation, kept as the reference result
+    df = advisor.get_expenses_df()
+    df = df[df['month'] == month]
+    return {
+        "total": df['amount'].sum(),
+        "by_category": df.groupby('category', observed=True)['amount'].sum().to_dict(),
+        "transaction_count": len(df),
+        "average_transaction": df['amount'].mean() if len(df) > 0 else 0
+    }
+
+
+def bench_summary(args) -> Dict:
+    from datetime import datetime
+
+    month = datetime.now().strftime("%Y-%m")
+    results = {}
+    for size in args.sizes:
+        advisor = synthetic_advisor(size)
+        expected = _dataframe_summary(advisor, month)
+        actual = advisor.get_monthly_summary(month)
+        max_diff = max([abs(expected["total"] - actual["total"])] +
+                       [abs(v - actual["by_category"].get(k, 0)) for k, v in expected["by_category"].items()])
+        results[size] = {
+            "dataframe": _summarize(_latencies(lambda _: _dataframe_summary(advisor, month), [None], args.repeat)),
+            "aggregates": _summarize(_latencies(lambda _: advisor.get_monthly_summary(month), [None], args.repeat)),
+            "matches_to_the_cent": max_diff < 0.005 and expected["transaction_count"] == actual["transaction_count"]
+        }
+    return results
+
+
+# Documented ledger bounds: capacity doubling keeps at most 2x the column
+# bytes, and a doubling holds old and new columns at once (3x)
+LEDGER_RETAINED_ROWS_FACTOR = 2
+LEDGER_PEAK_ROWS_FACTOR = 3
+
+
+def bench_ledger_memory(args) -> Dict:
+    import tracemalloc
+    from datetime import datetime
+    from expense_ledger import BYTES_PER_ROW, ExpenseLedger
+
+    batch = 1000
+    amounts, descriptions, categories = [12.5] * batch, ["coffee"] * batch, ["food_dining"] * batch
+    dates = [datetime.now()] * batch
+    report = {"sizes": {}, "failures": []}
+    for size in args.sizes:
+        tracemalloc.start()
+        baseline, _ = tracemalloc.get_traced_memory()
+        # Default capacity and chat-sized appends: the normal growth path
+        ledger = ExpenseLedger()
+        for start in range(0, size, batch):
+            count = min(batch, size - start)
+            ledger.extend(amounts[:count], descriptions[:count], categories[:count], dates[:count])
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        retained = (current - baseline) / size
+        peak_per_row = (peak - baseline) / size
+        report["sizes"][size] = {
+            "column_bytes_per_row": ledger.nbytes / size,
+            "traced_bytes_per_row": retained,
+            "traced_peak_bytes_per_row": peak_per_row,
+            "documented_bytes_per_row": BYTES_PER_ROW,
+            "mb_per_million": retained * 1_000_000 / 2**20
+        }
+        if retained > LEDGER_RETAINED_ROWS_FACTOR * BYTES_PER_ROW:
+            report["failures"].append(f"{size} rows retain {retained:.1f} B/row "
+                                      f"(bound {LEDGER_RETAINED_ROWS_FACTOR * BYTES_PER_ROW} B/row)")
+        if peak_per_row > LEDGER_PEAK_ROWS_FACTOR * BYTES_PER_ROW:
+            report["failures"].append(f"{size} rows peaked at {peak_per_row:.1f} B/row "
+                                      f"(bound {LEDGER_PEAK_ROWS_FACTOR * BYTES_PER_ROW} B/row)")
+    return report
+
+
+def bench_sqlite_summary(args) -> Dict:
+    import os
+    import random
+    import tempfile
+    from datetime import datetime, timedelta
+    from expense_store import SQLiteExpenseStore
+
+    rng = random.Random(0)
+    month = datetime.now().strftime("%Y-%m")
+    per_month = args.per_month
+    results = {}
+    for years in args.years:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = SQLiteExpenseStore(os.path.join(tmp, "bench.db"))
+            count = per_month * 12 * years
+            end = datetime.now()
+            dates = [end - timedelta(days=rng.uniform(0, 365 * years)) for _ in range(count)]
+            start = time.perf_counter()
+            store.add_many([round(rng.uniform(1, 200), 2) for _ in range(count)],
+                           [rng.choice(["coffee", "uber", "rent"]) for _ in range(count)],
+                           [rng.choice(["food_dining", "transportation", "utilities_bills"]) for _ in range(count)],
+                           dates)
+            insert_s = time.perf_counter() - start
+            results[f"{years}y"] = {
+                "expenses": count,
+                "bulk_insert_rows_per_sec": count / insert_s,
+                "monthly_summary": _summarize(_latencies(lambda _: store.monthly_summary(month), [None], args.repeat))
+            }
+            store.close()
+    return results
+
+
+def bench_recent(args) -> Dict:
+    results = {}
+    for size in args.sizes:
+        advisor = synthetic_advisor(size)
+        # Bulk-style history arrives out of order, so this covers the permuted path
+        advisor.get_recent_expenses(10)
+        results[size] = {
+            "recent_10": _summarize(_latencies(lambda _: advisor.get_recent_expenses(10), [None], args.repeat)),
+            "page_10": _summarize(_latencies(lambda _: advisor.get_expenses_page(10), [None], args.repeat))
+        }
+    return results
+
+
+def bench_concurrency(args) -> Dict:
+    import asyncio
+    from inference_executor import InferenceExecutor
+
+    executor = InferenceExecutor(mode=args.mode, max_workers=args.workers, max_pending=args.callers * 4,
+                                 classifier_kwargs={"use_rules": False})
+    messages = (EXPENSE_MESSAGES * args.repeat)
+
+    async def caller(index: int):
+        latencies = []
+        for message in messages[index::args.callers] or messages[:1]:
+            start = time.perf_counter()
+            await executor.classify_async(message)
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    async def run():
+        results = await asyncio.gather(*[caller(i) for i in range(args.callers)])
+        return [latency for latencies in results for latency in latencies]
+
+    start = time.perf_counter()
+    samples = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+    executor.shutdown()
+    return {
+        "callers": args.callers,
+        "caller_latency": _summarize(samples),
+        "messages_per_sec": len(samples) / elapsed,
+        "executor": executor.stats()
+    }
+
+
+def _worker_footprint(backend: str, started_at: float, barrier, results):
+    from category_cache import CategoryCache
+    from intent_classifier import IntentClassifier
+    from model_registry import _process_pss_bytes, _process_rss_bytes
+
+    classifier = IntentClassifier(use_rules=False, backend=backend, load_financial_context=False,
+                                  category_cache=CategoryCache())
+    classifier.classify_intent(EXPENSE_MESSAGES[0])
+    first_response = time.time() - started_at
+    # Measure only once every worker has its model, so shared pages are
+    # split between all of them
+    barrier.wait()
+    results.put({"first_response_s": first_response, "rss_bytes": _process_rss_bytes(),
+                 "pss_bytes": _process_pss_bytes()})
+    barrier.wait()
+
+
+def bench_workers(args) -> Dict:
+    import multiprocessing
+
+    context = multiprocessing.get_context("spawn")
+    report = {}
+    for backend in args.backends:
+        barrier = context.Barrier(args.workers)
+        results = context.Queue()
+        started_at = time.time()
+        workers = [context.Process(target=_worker_footprint, args=(backend, started_at, barrier, results))
+                   for _ in range(args.workers)]
+        for worker in workers:
+            worker.start()
+        samples = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+
+        rss = sorted(sample["rss_bytes"] for sample in samples)
+        pss = sum(sample["pss_bytes"] for sample in samples)
+        report[backend] = {
+            "workers": args.workers,
+            "time_to_first_response": _summarize([sample["first_response_s"] for sample in samples]),
+            "rss_mb_per_worker": [b / 2**20 for b in rss],
+            "total_pss_mb": pss / 2**20,
+            # PSS splits shared pages evenly, so the total over N workers
+            # grows by roughly each worker's private memory
+            "pss_mb_per_worker": pss / args.workers / 2**20
+        }
+    return report
+
+
+def _measure(fn: Callable, iterations: int) -> Dict:
+    import tracemalloc
+
+    fn()  # warm-up
+    samples = _latencies(lambda _: fn(), [None], iterations)
+    # Peak allocation from a separate traced run, so tracing overhead
+    # does not leak into the latencies
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        **_summarize(samples),
+        "p99_ms": _percentile(samples, 99) * 1000,
+        "ops_per_sec": len(samples) / sum(samples) if sum(samples) else float("inf"),
+        "peak_alloc_kb": peak / 1024
+    }
+
+
+def _environment() -> Dict:
+    import platform
+    import numpy as np
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+
+
+def bench_suite(args) -> Dict:
+    """Offline hot-path suite on the deterministic stub pipeline; results keyed "<path>/<ledger size>"."""
+    import tracemalloc
+    from category_cache import CategoryCache
+    from chatbot import FinanceChatbot
+    from intent_classifier import IntentClassifier
+    from stub_pipeline import StubZeroShotPipeline
+
+    def classifier(use_rules: bool):
+        return IntentClassifier(pipeline=StubZeroShotPipeline(), use_rules=use_rules,
+                                load_financial_context=False, category_cache=CategoryCache())
+
+    chat_messages = EXPENSE_MESSAGES + ["hello", "show my budget", "give me some advice",
+                                        "what are my spending trends", "how am I doing this month?"]
+    cycle = iter(range(10**12))
+    results = {}
+
+    extractor = classifier(True)
+    results["extract_expense_info/0"] = _measure(
+        lambda: extractor.extract_expense_info(EXPENSE_MESSAGES[next(cycle) % len(EXPENSE_MESSAGES)]),
+        args.iterations)
+    model_path = classifier(False)
+    results["classify_intent_model/0"] = _measure(
+        lambda: model_path.classify_intent(chat_messages[next(cycle) % len(chat_messages)]), args.iterations)
+
+    for size in args.ledger_sizes:
+        tracemalloc.start()
+        start = time.perf_counter()
+        advisor = synthetic_advisor(size, seed=args.seed)
+        build_s = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[f"build_ledger/{size}"] = {"seconds": build_s, "rows_per_sec": size / build_s,
+                                           "peak_alloc_kb": peak / 1024}
+
+        results[f"get_monthly_summary/{size}"] = _measure(advisor.get_monthly_summary, args.iterations)
+        results[f"get_budget_status/{size}"] = _measure(advisor.get_budget_status, args.iterations)
+        results[f"get_spending_advice/{size}"] = _measure(advisor.get_spending_advice, args.iterations)
+        results[f"get_recent_expenses/{size}"] = _measure(advisor.get_recent_expenses, args.iterations)
+        results[f"get_trends/{size}"] = _measure(advisor.get_trends, args.iterations)
+        results[f"get_expenses_df/{size}"] = _measure(
+            lambda: advisor.get_expenses_df(month=time.strftime("%Y-%m")), max(1, args.iterations // 10))
+
+        bot = FinanceChatbot(classifier=classifier(True), advisor=advisor)
+        results[f"process_message/{size}"] = _measure(
+            lambda: bot.process_message(chat_messages[next(cycle) % len(chat_messages)]), args.iterations)
+    return {"environment": _environment(), "results": results}
+
+
+def bench_tenants(args) -> Dict:
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        # An on-disk database, so evicted users really leave this process;
+        # with ":memory:" their rows would stay in SQLite's heap
+        return _bench_tenants(args, os.path.join(tmp, "tenants.db"))
+
+
+def _bench_tenants(args, path: str) -> Dict:
+    import tracemalloc
+    import numpy as np
+    from advisor_manager import AdvisorManager
+    from model_registry import _process_rss_bytes
+
+    count = args.users or 10_000
+    users = [f"user-{i}" for i in range(count)]
+    manager = AdvisorManager(path, max_active=count)
+    rng = np.random.default_rng(args.seed)
+    end = np.datetime64("now", "us")
+    for user_id in users:
+        dates = end - rng.uniform(0, 365 * 86400e6, args.per_user).astype("timedelta64[us]")
+        manager.store.for_user(user_id).add_many(
+            np.round(rng.uniform(1, 200, args.per_user), 2), ["coffee"] * args.per_user,
+            [manager.categories[i] for i in rng.integers(0, len(manager.categories), args.per_user)], dates)
+
+    rss_before = _process_rss_bytes()
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    for user_id in users:
+        manager.get(user_id).get_monthly_summary()
+    rehydrate_s = time.perf_counter() - start
+    active, _ = tracemalloc.get_traced_memory()
+    rss_active = _process_rss_bytes()
+
+    for user_id in users:
+        manager.evict(user_id)
+    idle, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # RSS also sees SQLite's page cache and allocator slack, which tracemalloc does not
+    rss_idle = _process_rss_bytes()
+
+    manager.max_active = count // 10
+    for user_id in users[:count // 10]:
+        manager.get(user_id)
+    hot = _latencies(lambda user_id: manager.get(user_id), users[:count // 10], args.repeat)
+    return {
+        "users": count,
+        "expenses_per_user": args.per_user,
+        "active_bytes_per_user": (active - baseline) / count,
+        "idle_bytes_per_user": (idle - baseline) / count,
+        "active_total_mb": (active - baseline) / 2**20,
+        "rss_growth_mb": (rss_active - rss_before) / 2**20,
+        "idle_rss_growth_mb": (rss_idle - rss_before) / 2**20,
+        "idle_rss_bytes_per_user": (rss_idle - rss_before) / count,
+        "rehydrate_ms_per_user": rehydrate_s / count * 1000,
+        "cached_get": _summarize(hot),
+        "manager": manager.stats()
+    }
+
+
+def bench_forecast(args) -> Dict:
+    """Nightly month-end forecast over a synthetic population (--users, default 100000).
+
+    Times the vectorized kernel on prebuilt arrays, a per-user loop over
+    the same kernel, and AdvisorManager.forecast() end to end over an
+    on-disk database holding the same expenses.
+    """
+    import tempfile
+    import numpy as np
+    from advisor_manager import AdvisorManager
+    from budget_advisor import DEFAULT_BUDGETS
+    from forecast import daily_spend, forecast_month_end
+
+    users = args.users or 100_000
+    rng = np.random.default_rng(args.seed)
+    categories = list(DEFAULT_BUDGETS)
+    month, day = "2026-06", 15
+    shape = (users, len(categories), 30)
+    rows = users * args.per_user
+    user_codes = np.repeat(np.arange(users), args.per_user)
+    category_codes = rng.integers(0, len(categories), rows)
+    codes = user_codes * len(categories) + category_codes
+    days = rng.integers(1, day + 1, rows)
+    amounts = np.round(rng.uniform(1, 60, rows), 2)
+    budgets = np.array([DEFAULT_BUDGETS[c] for c in categories], dtype=np.float32)
+
+    build = _measure(lambda: daily_spend(codes, days, amounts, shape), args.repeat)
+    daily = daily_spend(codes, days, amounts, shape)
+    score = _measure(lambda: forecast_month_end(daily, day, budgets=budgets), args.repeat)
+    forecast = forecast_month_end(daily, day, budgets=budgets)
+
+    # The same kernel called user by user, as a per-advisor loop would
+    sample = min(users, 1000)
+    start = time.perf_counter()
+    for user in range(sample):
+        forecast_month_end(daily[user], day, budgets=budgets)
+    per_user_ms = (time.perf_counter() - start) / sample * 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = AdvisorManager(os.path.join(tmp, "forecast.db"))
+        # Seeded with one bulk insert; per-user add_many would time the loader, not the forecast
+        user_ids = [f"user-{i}" for i in range(users)]
+        dates = [f"{month}-{d:02d} 12:00:00.000000" for d in range(day + 1)]
+        start = time.perf_counter()
+        conn = manager.store.conn
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT INTO expenses (user_id, amount, description, category, date, month) VALUES (?, ?, ?, ?, ?, ?)",
+            ((user_ids[u], a, "coffee", categories[c], dates[d], month)
+             for u, c, d, a in zip(user_codes.tolist(), category_codes.tolist(), days.tolist(), amounts.tolist())))
+        conn.execute("COMMIT")
+        fill_s = time.perf_counter() - start
+        manager_forecast = _measure(lambda: manager.forecast(month, day), args.repeat)
+        managed = manager.forecast(month, day)
+        manager.close()
+
+    return {
+        "users": users,
+        "expenses_per_user": args.per_user,
+        "array_mb": daily.nbytes / 2**20,
+        "build": build,
+        "score": score,
+        "per_user_loop_ms": per_user_ms,
+        "per_user_loop_total_s": per_user_ms * users / 1000,
+        "users_projected_over": int((forecast["overspend"].sum(axis=1) > 0).sum()),
+        "manager_fill_s": fill_s,
+        "manager_forecast": manager_forecast,
+        "manager_users": len(managed["users"]),
+        "manager_users_projected_over": int((managed["overspend"].sum(axis=1) > 0).sum())
+    }
+
+
+COMPARED_METRICS = {"p50_ms": "lower", "p95_ms": "lower", "peak_alloc_kb": "lower", "seconds": "lower"}
+
+
+def bench_compare(args) -> Dict:
+    """Compare two suite outputs; a regression is any metric worse by more than --threshold."""
+    if not args.files or len(args.files) != 2:
+        raise SystemExit("compare needs --files BASELINE.json CURRENT.json")
+    with open(args.files[0]) as f:
+        baseline = json.load(f)
+    with open(args.files[1]) as f:
+        current = json.load(f)
+
+    changes, failures = {}, []
+    for key in sorted(set(baseline["results"]) & set(current["results"])):
+        for metric in COMPARED_METRICS:
+            old = baseline["results"][key].get(metric)
+            new = current["results"][key].get(metric)
+            if old is None or new is None or old <= 0:
+                continue
+            ratio = new / old
+            changes[f"{key}:{metric}"] = round(ratio, 3)
+            # Sub-tenth-of-a-millisecond swings are timer noise, not regressions
+            if metric.endswith("_ms") and new - old < args.min_delta_ms:
+                continue
+            if ratio > 1 + args.threshold:
+                failures.append(f"{key} {metric}: {old:.3f} -> {new:.3f} ({ratio - 1:+.0%})")
+    return {
+        "baseline": baseline.get("environment", {}).get("commit"),
+        "current": current.get("environment", {}).get("commit"),
+        "ratios": changes,
+        "failures": failures
+    }
+
+
+BENCHMARKS = {
+    "combined": bench_combined,
+    "batch": bench_batch,
+    "startup": bench_startup,
+    "summary": bench_summary,
+    "ledger_memory": bench_ledger_memory,
+    "sqlite_summary": bench_sqlite_summary,
+    "recent": bench_recent,
+    "concurrency": bench_concurrency,
+    "import_time": bench_import_time,
+    "workers": bench_workers,
+    "suite": bench_suite,
+    "compare": bench_compare,
+    "tenants": bench_tenants,
+    "forecast": bench_forecast,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Personal finance chatbot benchmarks")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--messages", type=int, default=256)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--per-month", type=int, default=5000)
+    parser.add_argument("--callers", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--mode", choices=["thread", "process"], default="thread")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--backends", nargs="+", default=["torch", "mmap"])
+    parser.add_argument("--ledger-sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--users", type=int, default=None,
+                        help="Users for tenants (default 10000) and forecast (default 100000)")
+    parser.add_argument("--per-user", type=int, default=50)
+    parser.add_argument("--output", default=None, help="Also write the JSON result to this file")
+    parser.add_argument("--files", nargs=2, metavar=("BASELINE", "CURRENT"), help="Suite outputs to compare")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown for compare")
+    parser.add_argument("--min-delta-ms", type=float, default=0.1, help="Ignore smaller latency changes")
+    args = parser.parse_args()
+
+    result = BENCHMARKS[args.benchmark](args)
+    print(json.dumps(result, indent=2, default=str))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2, default=str)
+    if result.get("failures"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
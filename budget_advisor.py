@@ -1,62 +1,249 @@
-import pandas as pd
+import os
+from datetime import datetime
+from typing import TYPE_CHECKING, Callable, Dict, List, Mapping, Optional, Tuple
 import numpy as np
-from datetime import datetime, timedelta
-from typing import Dict, List
-import json
+from category_cache import CategoryCache
+from expense_store import ExpenseStore, MemoryExpenseStore, open_store
+from forecast import DailyTotals, forecast_month_end, month_to_date, overspending
+from metrics import span
+from rollup_cube import RollupCube
+from snapshot import read_manifest, write_manifest, writing
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_BUDGETS = {
+    "food_dining": 500,
+    "transportation": 300,
+    "shopping": 400,
+    "entertainment": 200,
+    "utilities_bills": 250,
+    "healthcare": 150,
+    "education": 100,
+    "travel": 300,
+    "other": 200
+}
+STATUSES = ("good", "warning", "over_budget")
+WARNING_PERCENT = 80
+# Projections from the first couple of days are mostly noise
+MIN_FORECAST_DAYS = 3
+
+
+def budget_status(spent: float, budget: float) -> str:
+    percentage_used = (spent / budget) * 100 if budget > 0 else 0
+    return "over_budget" if spent > budget else "warning" if percentage_used > WARNING_PERCENT else "good"
+
 
 class BudgetAdvisor:
-    def __init__(self):
-        self.expenses = []
-        self.budgets = {
-            "food_dining": 500,
-            "transportation": 300,
-            "shopping": 400,
-            "entertainment": 200,
-            "utilities_bills": 250,
-            "healthcare": 150,
-            "education": 100,
-            "travel": 300,
-            "other": 200
-        }
-        self.total_budget = sum(self.budgets.values())
+    def __init__(self, storage="memory", user_id: str = "default", shared_budgets: Mapping[str, float] = None,
+                 categories: List[str] = None):
+        # shared_budgets (read-only, e.g. a MappingProxyType) is used as-is
+        # until this user changes a budget, then copied
+        self._budgets_shared = shared_budgets is not None
+        self.budgets = shared_budgets if self._budgets_shared else dict(DEFAULT_BUDGETS)
+        categories = categories or list(self.budgets)
+        self._total_budget = sum(self.budgets.values())
+        # Bumped on every ledger or budget change so callers can cache derived views
+        self.version = 0
+        self.store = storage if isinstance(storage, ExpenseStore) else open_store(storage, user_id, categories)
+        
+        saved = self.store.load_budgets()
+        if saved is not None:
+            budgets, self._total_budget = saved
+            self.budgets = {**self.budgets, **budgets}
+            self._budgets_shared = False
+        
+        # This user's own categories for descriptions (normalized as in the
+        # category cache); checked before rules, cache and model, never evicted
+        self.category_corrections: Dict[str, str] = self.store.load_category_corrections()
+        
+        # Month x category rollup for trend questions and alerts. A store
+        # that keeps one (the memory store) is the only copy; otherwise it
+        # is rebuilt from the store's per-month totals and kept current below
+        self.rollup = self.store.rollup_cube()
+        self._own_rollup = self.rollup is None
+        if self._own_rollup:
+            self.rollup = RollupCube(categories)
+            self.rollup.load(self.store.monthly_totals())
+        self._alert_callbacks: List[Callable[[Dict], None]] = []
+        # Per-day totals of the month being forecast, built on first use
+        self._daily: Optional[DailyTotals] = None
+    
+    @property
+    def total_budget(self) -> float:
+        return self._total_budget
     
-    def add_expense(self, amount: float, description: str, category: str):
-        expense = {
-            "id": len(self.expenses) + 1,
-            "amount": amount,
-            "description": description,
+    @total_budget.setter
+    def total_budget(self, amount: float):
+        previous = self._total_budget
+        self._total_budget = amount
+        self.store.save_budgets(self.budgets, amount)
+        self.version += 1
+        if self._alert_callbacks:
+            month = datetime.now().strftime("%Y-%m")
+            spent = self.rollup.total(month)
+            self._alert("overall", month, budget_status(spent, previous), spent, amount)
+    
+    def on_alert(self, callback: Callable[[Dict], None]):
+        """Call `callback(event)` whenever this month's spending in a category,
+        or overall, crosses 80% of its budget, goes over it, or drops back under.
+        
+        Events fire on the change that crosses a threshold, once per
+        crossing. Each change only checks the cells it touched, using the
+        rollup's running totals.
+        """
+        self._alert_callbacks.append(callback)
+    
+    def _check_alerts(self, month: str, deltas: Dict[str, float]):
+        # deltas: how much each touched category's total for `month` just changed
+        if not self._alert_callbacks or month != datetime.now().strftime("%Y-%m"):
+            return
+        for category, delta in deltas.items():
+            budget = self.budgets.get(category)
+            if budget is not None and delta:
+                spent = self.rollup.total(month, category)
+                self._alert(category, month, budget_status(spent - delta, budget), spent, budget)
+        delta = sum(deltas.values())
+        if delta:
+            spent = self.rollup.total(month)
+            self._alert("overall", month, budget_status(spent - delta, self.total_budget), spent, self.total_budget)
+    
+    def _alert(self, category: str, month: str, previous: str, spent: float, budget: float):
+        status = budget_status(spent, budget)
+        if status == previous:
+            return
+        event = {
+            "event": status if STATUSES.index(status) > STATUSES.index(previous) else "back_under",
             "category": category,
-            "date": datetime.now(),
-            "month": datetime.now().strftime("%Y-%m")
+            "month": month,
+            "status": status,
+            "previous": previous,
+            "spent": spent,
+            "budget": budget,
+            "percentage_used": (spent / budget) * 100 if budget > 0 else 0
         }
-        self.expenses.append(expense)
+        for callback in self._alert_callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Warning: budget alert callback failed: {e}")
+    
+    @property
+    def expenses(self) -> List[Dict]:
+        return self.store.records()
+    
+    def add_expense(self, amount: float, description: str, category: str, date: datetime = None):
+        with span("ledger_write"):
+            expense = self.store.add(amount, description, category, date or datetime.now())
+            if self._own_rollup:
+                self.rollup.add(expense["month"], category, amount)
+            if self._daily is not None:
+                self._daily.add(category, expense["date"], amount)
+        self.version += 1
+        self._check_alerts(expense["month"], {category: amount})
+        return expense
+    
+    def add_expenses(self, amounts, descriptions: List[str], categories: List[str], dates) -> int:
+        count = self.store.add_many(amounts, descriptions, categories, dates)
+        if self._own_rollup:
+            self.rollup.add_many(dates, categories, amounts)
+        if self._daily is not None:
+            self._daily.add_many(dates, categories, amounts)
+        self.version += 1
+        if self._alert_callbacks:
+            month = np.datetime64(datetime.now().strftime("%Y-%m"), "M")
+            in_month = np.asarray(dates, dtype="datetime64[M]") == month
+            deltas = {}
+            for category, amount in zip(np.asarray(categories)[in_month], np.asarray(amounts, dtype=np.float64)[in_month]):
+                deltas[category] = deltas.get(category, 0.0) + amount
+            self._check_alerts(str(month), deltas)
+        return count
+    
+    def update_expense(self, expense_id: int, amount: float = None, description: str = None,
+                       category: str = None):
+        old = self.store.get(expense_id)
+        expense = self.store.update(expense_id, amount=amount, description=description, category=category)
+        if expense is not None:
+            if self._own_rollup:
+                self.rollup.remove(old["month"], old["category"], old["amount"])
+                self.rollup.add(expense["month"], expense["category"], expense["amount"])
+            if self._daily is not None:
+                self._daily.add(old["category"], old["date"], -old["amount"])
+                self._daily.add(expense["category"], expense["date"], expense["amount"])
+            self.version += 1
+            deltas = {old["category"]: -old["amount"]}
+            deltas[expense["category"]] = deltas.get(expense["category"], 0.0) + expense["amount"]
+            self._check_alerts(expense["month"], deltas)
         return expense
     
-    def get_expenses_df(self) -> pd.DataFrame:
-        if not self.expenses:
+    def delete_expense(self, expense_id: int):
+        expense = self.store.delete(expense_id)
+        if expense is not None:
+            if self._own_rollup:
+                self.rollup.remove(expense["month"], expense["category"], expense["amount"])
+            if self._daily is not None:
+                self._daily.add(expense["category"], expense["date"], -expense["amount"])
+            self.version += 1
+            self._check_alerts(expense["month"], {expense["category"]: -expense["amount"]})
+        return expense
+    
+    def correct_category(self, description: str, category: str):
+        key = CategoryCache.normalize(description)
+        if key:
+            self.category_corrections[key] = category
+            self.store.save_category_correction(key, category)
+    
+    def get_expenses_df(self, month: str = None, category: str = None) -> "pd.DataFrame":
+        if not self.store.count():
+            import pandas as pd
             return pd.DataFrame()
-        return pd.DataFrame(self.expenses)
+        return self.store.to_frame(month=month, category=category)
+    
+    def get_recent_expenses(self, limit: int = 10) -> List[Dict]:
+        return self.store.page(limit)
+    
+    def get_expenses_page(self, limit: int = 20, cursor: Tuple[datetime, int] = None) -> Tuple[List[Dict], Optional[Tuple]]:
+        # One extra row tells us whether an older page exists
+        expenses = self.store.page(limit + 1, before=cursor)
+        if len(expenses) <= limit:
+            return expenses, None
+        expenses = expenses[:limit]
+        return expenses, (expenses[-1]["date"], expenses[-1]["id"])
     
     def get_monthly_summary(self, month: str = None) -> Dict:
-        if not self.expenses:
-            return {"total": 0, "by_category": {}, "transaction_count": 0}
-        
-        df = self.get_expenses_df()
-        
-        if month:
-            df = df[df['month'] == month]
-        else:
-            current_month = datetime.now().strftime("%Y-%m")
-            df = df[df['month'] == current_month]
-        
-        summary = {
-            "total": df['amount'].sum(),
-            "by_category": df.groupby('category')['amount'].sum().to_dict(),
-            "transaction_count": len(df),
-            "average_transaction": df['amount'].mean() if len(df) > 0 else 0
-        }
+        with span("summary"):
+            if not self.store.count():
+                return {"total": 0, "by_category": {}, "transaction_count": 0}
+            
+            return self.store.monthly_summary(month or datetime.now().strftime("%Y-%m"))
+    
+    def get_trends(self, months: int = 12, category: str = None, end_month: str = None) -> Dict:
+        with span("trends"):
+            return self.rollup.trends(end_month or datetime.now().strftime("%Y-%m"), months, category)
+    
+    def get_forecast(self, month: str = None, day: int = None) -> Dict:
+        """Projected month-end spending per budget category (see forecast.forecast_month_end).
         
-        return summary
+        day defaults to today for the current month and to the last day
+        for past months.
+        """
+        month, day = month_to_date(month, day)
+        daily = self._daily_totals(month)
+        forecast = forecast_month_end(daily.totals, day, budgets=[self.budgets[category] for category in daily.categories])
+        forecast["categories"] = daily.categories
+        forecast["month"] = month
+        return forecast
+    
+    def _daily_totals(self, month: str) -> DailyTotals:
+        # Read from the store once per month; every later change updates it in place
+        categories = list(self.budgets)
+        if self._daily is None or self._daily.month != month or self._daily.categories != categories:
+            daily = DailyTotals(month, categories)
+            if self.store.count():
+                df = self.store.to_frame(month=month)
+                daily.add_many(df["date"].to_numpy(), df["category"].tolist(), df["amount"].to_numpy())
+            self._daily = daily
+        return self._daily
     
     def get_budget_status(self) -> Dict:
         summary = self.get_monthly_summary()
@@ -72,8 +259,7 @@ class BudgetAdvisor:
                 "spent": spent,
                 "remaining": remaining,
                 "percentage_used": percentage_used,
-                "status": "over_budget" if spent > budget_limit else 
-                         "warning" if percentage_used > 80 else "good"
+                "status": budget_status(spent, budget_limit)
             }
         
         total_spent = summary["total"]
@@ -84,8 +270,7 @@ class BudgetAdvisor:
             "spent": total_spent,
             "remaining": total_remaining,
             "percentage_used": (total_spent / self.total_budget) * 100,
-            "status": "over_budget" if total_spent > self.total_budget else
-                     "warning" if (total_spent / self.total_budget) > 0.8 else "good"
+            "status": budget_status(total_spent, self.total_budget)
         }
         
         return status
@@ -123,6 +308,16 @@ class BudgetAdvisor:
             high_usage = max(warning_categories, key=lambda x: x[1])
             advice.append(f"Watch your '{high_usage[0]}' spending - you're at {high_usage[1]:.1f}% of budget.")
         
+        forecast = self.get_forecast() if summary["transaction_count"] > 0 else None
+        if forecast is not None and MIN_FORECAST_DAYS <= forecast["day"] < forecast["days"]:
+            for category, overspend, projected, budget in overspending(forecast, forecast["categories"])[:3]:
+                advice.append(f"At this pace you'll overspend '{category}' by ${overspend:.2f} this month (projected ${projected:.2f} of ${budget:.2f}).")
+            projected_total = float(forecast["projected"].sum())
+            if projected_total > self.total_budget:
+                advice.append(f"You're on track to finish the month at ${projected_total:.2f}, ${projected_total - self.total_budget:.2f} over your ${self.total_budget:.2f} budget.")
+            else:
+                advice.append(f"You're on track to finish the month at ${projected_total:.2f} of your ${self.total_budget:.2f} budget.")
+        
         if summary["transaction_count"] > 0:
             avg_transaction = summary["average_transaction"]
             if avg_transaction < 10:
@@ -140,8 +335,56 @@ class BudgetAdvisor:
     def set_budget(self, category: str, amount: float):
         if category in self.budgets:
             old_amount = self.budgets[category]
+            if self._budgets_shared:
+                self.budgets = dict(self.budgets)
+                self._budgets_shared = False
             self.budgets[category] = amount
+            if self._alert_callbacks:
+                month = datetime.now().strftime("%Y-%m")
+                spent = self.rollup.total(month, category)
+                self._alert(category, month, budget_status(spent, old_amount), spent, amount)
             self.total_budget = sum(self.budgets.values())
             return f"Updated {category} budget from ${old_amount:.2f} to ${amount:.2f}"
         else:
             return f"Category '{category}' not found. Available categories: {list(self.budgets.keys())}"
+    
+    def save(self, path: str):
+        """Write expenses and budgets to a snapshot directory (see load()).
+        
+        A SQLite-backed advisor is copied into a memory ledger first, so
+        the saved expense ids are renumbered from 1.
+        """
+        store = self.store
+        if not isinstance(store, MemoryExpenseStore):
+            store = MemoryExpenseStore(categories=list(self.rollup.categories))
+            df = self.store.to_frame()
+            if len(df):
+                store.add_many(df["amount"].to_numpy(), df["description"].tolist(), df["category"].tolist(),
+                               df["date"].to_numpy())
+        with writing(path) as directory:
+            store.save(os.path.join(directory, "expenses"))
+            write_manifest(directory, "budget_advisor", {
+                "budgets": dict(self.budgets),
+                "total_budget": self._total_budget,
+                "categories": list(self.rollup.categories),
+                "category_corrections": self.category_corrections
+            })
+    
+    @classmethod
+    def load(cls, path: str, shared_budgets: Mapping[str, float] = None) -> "BudgetAdvisor":
+        """Open a snapshot written by save() as an in-memory advisor.
+        
+        Expense columns are memory-mapped rather than read, and the rollup
+        is rebuilt from the saved monthly totals, so opening does not
+        depend on the number of expenses.
+        """
+        manifest = read_manifest(path, "budget_advisor")
+        store = MemoryExpenseStore.open(os.path.join(path, "expenses"))
+        advisor = cls(store, shared_budgets=shared_budgets, categories=manifest["categories"])
+        if shared_budgets is None or dict(shared_budgets) != manifest["budgets"]:
+            advisor.budgets = dict(manifest["budgets"])
+            advisor._budgets_shared = False
+        advisor._total_budget = manifest["total_budget"]
+        # Snapshots written before corrections were saved have none
+        advisor.category_corrections = dict(manifest.get("category_corrections", {}))
+        return advisor
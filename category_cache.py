@@ -0,0 +1,129 @@
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+FILLER_WORDS = re.compile(r'\b(?:spent|spend|paid|pay|bought|buy|purchased|add|added|a|an|the|my|some)\b')
+NON_WORD = re.compile(r'[^a-z0-9]+')
+DEFAULT_TTL = object()
+
+
+class CategoryCache:
+    """Bounded LRU of description -> category, with optional TTL and disk snapshots."""
+
+    SNAPSHOT_VERSION = 1
+
+    def __init__(self, maxsize: int = 10000, ttl: float = None, path: str = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = path
+        self._entries = OrderedDict()  # key -> (category, expires_at or None)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if path:
+            if os.path.exists(path):
+                self.load(path)
+            atexit.register(self.save)
+
+    @staticmethod
+    def normalize(description: str) -> str:
+        text = NON_WORD.sub(' ', description.lower())
+        return ' '.join(FILLER_WORDS.sub(' ', text).split())
+
+    def get(self, description: str) -> Optional[str]:
+        key = self.normalize(description)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= time.time():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, description: str, category: str, ttl=DEFAULT_TTL):
+        # ttl=None stores the entry without expiry
+        ttl = self.ttl if ttl is DEFAULT_TTL else ttl
+        key = self.normalize(description)
+        if not key:
+            return
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (category, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def save(self, path: str = None):
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            entries = [[key, category, expires_at] for key, (category, expires_at) in self._entries.items()]
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": self.SNAPSHOT_VERSION, "entries": entries}, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str = None):
+        path = path or self.path
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not load category cache snapshot: {e}")
+            return
+
+        now = time.time()
+        with self._lock:
+            # Snapshot is stored least- to most-recently used, so replaying it
+            # restores the LRU order.
+            for key, category, expires_at in snapshot.get("entries", []):
+                if expires_at is not None and expires_at <= now:
+                    continue
+                self._entries[key] = (category, expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_category_cache() -> CategoryCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CategoryCache()
+    return _cache
@@ -1,18 +1,78 @@
+import argparse
 import json
-from typing import Dict
+import os
+import time
+from typing import Dict, List
 from datetime import datetime
+import numpy as np
 from intent_classifier import IntentClassifier
-from budget_advisor import BudgetAdvisor
+from model_cascade import parse_stage
+from budget_advisor import WARNING_PERCENT, BudgetAdvisor
+from inference_executor import InferenceExecutor, get_inference_executor
+from metrics import Metrics, span
+from snapshot import load_column, load_strings, read_manifest, save_column, save_strings, write_manifest, writing
 
 class FinanceChatbot:
-    def __init__(self):
-        self.classifier = IntentClassifier()
-        self.advisor = BudgetAdvisor()
+    def __init__(self, classifier: IntentClassifier = None, advisor: BudgetAdvisor = None,
+                 executor: InferenceExecutor = None, metrics: Metrics = None):
+        self.classifier = classifier or IntentClassifier()
+        self.advisor = advisor or BudgetAdvisor()
+        self.executor = executor
+        self.metrics = metrics or Metrics()
         self.conversation_history = []
+        # Threshold crossings raised by this turn's ledger changes, shown with the reply
+        self.pending_alerts: List[Dict] = []
+        self.advisor.on_alert(self.pending_alerts.append)
+        self._register_metrics()
+    
+    def _register_metrics(self):
+        stats = self.classifier.stats
+        cache = self.classifier.category_cache
+        self.metrics.register("chat_model_calls_total", lambda: stats["model_calls"], "counter",
+                              "Zero-shot model calls")
+        self.metrics.register("chat_rule_hits_total", lambda: stats["rule_hits"], "counter",
+                              "Intents decided by the rule tier")
+        self.metrics.register("category_cache_hits_total", lambda: cache.hits, "counter")
+        self.metrics.register("category_cache_misses_total", lambda: cache.misses, "counter")
+        self.metrics.register("ledger_expenses", lambda: self.advisor.store.count(), "gauge",
+                              "Expenses in the ledger")
     
     def process_message(self, user_input: str) -> str:
-        intent, confidence, extracted_info = self.classifier.classify_intent(user_input)
-        
+        with self.metrics.request() as trace:
+            intent, confidence, extracted_info = self.classifier.classify_intent(
+                user_input, self.advisor.category_corrections)
+            trace.intent = intent
+            return self._respond(user_input, intent, confidence, extracted_info)
+    
+    async def process_message_async(self, user_input: str) -> str:
+        # Sessions share one process-wide pool unless given their own
+        executor = self.executor or get_inference_executor()
+        started = time.perf_counter()
+        # Only classification leaves this thread; the ledger is updated here
+        intent, confidence, extracted_info = await executor.classify_async(
+            user_input, self.advisor.category_corrections, self.classifier)
+        classified = time.perf_counter()
+        # Spans are thread-local, so the trace only starts once we are back
+        # on the loop and nothing else can interleave until it ends
+        with self.metrics.request(started=started) as trace:
+            trace.intent = intent
+            trace.stages["classify_async"] = (classified - started) * 1000
+            return self._respond(user_input, intent, confidence, extracted_info)
+    
+    def process_messages(self, user_inputs: List[str], batch_size: int = None) -> List[str]:
+        start = time.perf_counter()
+        classifications = self.classifier.classify_batch(user_inputs, batch_size,
+                                                         corrections=self.advisor.category_corrections)
+        self.metrics.histogram("chat_batch_classify_latency_ms").observe((time.perf_counter() - start) * 1000)
+        # Ledger mutations are applied one message at a time, in input order
+        responses = []
+        for user_input, classification in zip(user_inputs, classifications):
+            with self.metrics.request() as trace:
+                trace.intent = classification[0]
+                responses.append(self._respond(user_input, *classification))
+        return responses
+    
+    def _respond(self, user_input: str, intent: str, confidence: float, extracted_info: Dict) -> str:
         self.conversation_history.append({
             "user": user_input,
             "intent": intent,
@@ -20,7 +80,11 @@ class FinanceChatbot:
             "timestamp": datetime.now()
         })
         
-        response = self._generate_response(intent, extracted_info, user_input)
+        with span("respond"):
+            response = self._generate_response(intent, extracted_info, user_input)
+            if self.pending_alerts:
+                response += "\n\n" + "\n".join(format_alert(event) for event in self.pending_alerts)
+                self.pending_alerts.clear()
         
         self.conversation_history.append({
             "bot": response,
@@ -29,6 +93,26 @@ class FinanceChatbot:
         
         return response
     
+    def save(self, path: str):
+        """Snapshot the advisor's expenses and budgets plus the conversation history."""
+        self.advisor.save(path)
+        with writing(os.path.join(path, "history")) as directory:
+            save_history(directory, self.conversation_history)
+    
+    @classmethod
+    def load(cls, path: str, classifier: IntentClassifier = None, executor: InferenceExecutor = None,
+             metrics: Metrics = None) -> "FinanceChatbot":
+        bot = cls(classifier=classifier, advisor=BudgetAdvisor.load(path), executor=executor, metrics=metrics)
+        if os.path.exists(os.path.join(path, "history")):
+            bot.conversation_history = load_history(os.path.join(path, "history"))
+        return bot
+    
+    def correct_category(self, expense_id: int, category: str):
+        expense = self.advisor.update_expense(expense_id, category=category)
+        if expense is not None:
+            self.advisor.correct_category(expense["description"], category)
+        return expense
+    
     def _generate_response(self, intent: str, extracted_info: Dict, user_input: str) -> str:
         
         if intent == "greeting":
@@ -87,6 +171,9 @@ Just tell me what you'd like to do!"""
                 return "Please specify a budget amount, like: 'Set my budget to $3000' or 'Update food budget to $500'"
         
         elif intent == "analyze_trends":
+            if extracted_info.get("months"):
+                return self._trend_response(extracted_info["months"], extracted_info.get("category"))
+            
             summary = self.advisor.get_monthly_summary()
             if not summary["by_category"]:
                 return "No expenses recorded yet. Start by adding some expenses!"
@@ -109,25 +196,129 @@ Just tell me what you'd like to do!"""
         else:
             return "I'm not sure how to help with that. Try asking about expenses, budgets, or say 'help' for more options."
 
+    def _trend_response(self, months: int, category: str = None) -> str:
+        trends = self.advisor.get_trends(months, category)
+        if not trends["total"]:
+            return f"No {category + ' ' if category else ''}expenses in the last {months} months yet."
+        
+        label = category or "Total"
+        response = f" {label} spending, last {months} months \n\n"
+        for month, total, change in zip(trends["months"], trends["totals"], trends["month_over_month_pct"]):
+            change_text = f" ({change:+.0f}%)" if change is not None else ""
+            response += f"• {month}: ${total:.2f}{change_text}\n"
+        
+        response += f"\nAverage: ${trends['average']:.2f}/month"
+        response += f" · 3-month average now ${trends['rolling_mean'][-1]:.2f}\n"
+        first, last = trends["totals"][0], trends["totals"][-1]
+        response += f"From {trends['months'][0]} to {trends['months'][-1]}: ${first:.2f} → ${last:.2f}\n"
+        yoy = trends["year_over_year_pct"][-1]
+        if yoy is not None:
+            response += f"Year over year ({trends['months'][-1]}): {yoy:+.0f}%\n"
+        
+        if category is None and trends.get("by_category"):
+            window_totals = {cat: sum(values) for cat, values in trends["by_category"].items()}
+            top = max(window_totals, key=window_totals.get)
+            response += f"Top category over the period: {top} (${window_totals[top]:.2f})\n"
+        
+        return response
+
+def format_alert(event: Dict) -> str:
+    label = "Overall spending" if event["category"] == "overall" else event["category"]
+    amounts = f"${event['spent']:.2f} / ${event['budget']:.2f} ({event['percentage_used']:.1f}%)"
+    if event["event"] == "over_budget":
+        return f"🚨 Alert: {label} is now over budget: {amounts}"
+    if event["event"] == "warning":
+        return f"⚠️ Alert: {label} has passed {WARNING_PERCENT}% of its budget: {amounts}"
+    if event["status"] == "warning":
+        return f"✅ {label} is back under budget: {amounts}"
+    return f"✅ {label} is back under {WARNING_PERCENT}% of its budget: {amounts}"
+
+def save_history(directory: str, history: List[Dict]):
+    # One row per turn: user turns carry intent and confidence, bot turns don't
+    intents = sorted({turn["intent"] for turn in history if "intent" in turn})
+    codes = {intent: code for code, intent in enumerate(intents)}
+    save_column(directory, "is_bot", np.array(["bot" in turn for turn in history], dtype=bool))
+    save_column(directory, "intent_code", np.array([codes.get(turn.get("intent"), -1) for turn in history],
+                                                   dtype=np.int16))
+    save_column(directory, "confidence", np.array([turn.get("confidence", np.nan) for turn in history],
+                                                  dtype=np.float64))
+    save_column(directory, "timestamp", np.array([turn["timestamp"] for turn in history], dtype="datetime64[us]"))
+    save_strings(directory, "text", (turn["bot"] if "bot" in turn else turn["user"] for turn in history))
+    write_manifest(directory, "conversation_history", {"rows": len(history), "intents": intents})
+
+def load_history(directory: str) -> List[Dict]:
+    manifest = read_manifest(directory, "conversation_history")
+    rows, intents = manifest["rows"], manifest["intents"]
+    is_bot = load_column(directory, "is_bot", rows, bool)
+    intent_codes = load_column(directory, "intent_code", rows, np.int16)
+    confidences = load_column(directory, "confidence", rows, np.float64)
+    timestamps = load_column(directory, "timestamp", rows, "datetime64[us]").astype(datetime)
+    text = load_strings(directory, "text")
+    history = []
+    for i in range(rows):
+        if is_bot[i]:
+            history.append({"bot": text[i], "timestamp": timestamps[i]})
+        else:
+            history.append({"user": text[i], "intent": intents[intent_codes[i]],
+                            "confidence": float(confidences[i]), "timestamp": timestamps[i]})
+    return history
+
 def main():
-    bot = FinanceChatbot()
+    parser = argparse.ArgumentParser(description="Personal Finance Chatbot")
+    parser.add_argument("--storage", default="memory",
+                        help="Expense storage: 'memory' (default) or 'sqlite:<path>'")
+    parser.add_argument("--backend", default="torch", choices=["torch", "int8", "onnx", "mmap"],
+                        help="Inference backend; int8/onnx/mmap load artifacts written by "
+                             "'python inference_backends.py export'")
+    parser.add_argument("--cascade", nargs="+", metavar="MODEL[:MIN_SCORE[:MIN_MARGIN]]",
+                        help="Zero-shot models to try in order, escalating when a stage is unsure")
+    parser.add_argument("--metrics-file", default=None,
+                        help="Write Prometheus text metrics here on exit (.json for a JSON snapshot)")
+    parser.add_argument("--profile-rate", type=float, default=0.0,
+                        help="Fraction of messages to run under cProfile/tracemalloc")
+    parser.add_argument("--profile-dir", default=None, help="Where sampled .prof files are written")
+    parser.add_argument("--snapshot", default=None,
+                        help="Snapshot directory: expenses, budgets and history are loaded from it "
+                             "if it exists and saved back on exit")
+    args = parser.parse_args()
+    
+    cascade = [parse_stage(spec) for spec in args.cascade] if args.cascade else None
+    classifier = IntentClassifier(backend=args.backend, cascade=cascade, lazy_model=True)
+    metrics = Metrics(profile_rate=args.profile_rate, profile_dir=args.profile_dir)
+    if args.snapshot and os.path.exists(args.snapshot):
+        bot = FinanceChatbot.load(args.snapshot, classifier=classifier, metrics=metrics)
+    else:
+        bot = FinanceChatbot(classifier=classifier, advisor=BudgetAdvisor(storage=args.storage), metrics=metrics)
+    # Greetings, help and plain expense entries are answered by the rules
+    # while the model is still loading
+    classifier.load_in_background()
     
     print("🤖 Personal Finance Chatbot")
     print("=" * 40)
     print("Type 'quit' to exit, 'help' for commands\n")
     
-    while True:
-        user_input = input("You: ").strip()
-        
-        if user_input.lower() in ['quit', 'exit', 'bye']:
-            print("Goodbye! Keep tracking those expenses!")
-            break
-        
-        if not user_input:
-            continue
-        
-        response = bot.process_message(user_input)
-        print(f"Bot: {response}\n")
+    try:
+        while True:
+            user_input = input("You: ").strip()
+            
+            if user_input.lower() in ['quit', 'exit', 'bye']:
+                print("Goodbye! Keep tracking those expenses!")
+                break
+            
+            if not user_input:
+                continue
+            
+            response = bot.process_message(user_input)
+            print(f"Bot: {response}\n")
+    finally:
+        if args.snapshot:
+            bot.save(args.snapshot)
+        if args.metrics_file:
+            with open(args.metrics_file, "w") as f:
+                if args.metrics_file.endswith(".json"):
+                    json.dump(metrics.snapshot(), f, indent=2)
+                else:
+                    f.write(metrics.to_prometheus())
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,136 @@
+import argparse
+import time
+from typing import Callable, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from budget_advisor import BudgetAdvisor
+
+DATE_COLUMNS = ["date", "transaction date", "posted date", "posting date", "trans date"]
+AMOUNT_COLUMNS = ["amount", "debit", "withdrawal", "transaction amount"]
+DESCRIPTION_COLUMNS = ["description", "payee", "merchant", "name", "memo", "details"]
+
+
+def _find_column(columns: List[str], candidates: List[str], explicit: Optional[str]) -> str:
+    if explicit is not None:
+        return explicit
+    by_name = {column.strip().lower(): column for column in columns}
+    for candidate in candidates:
+        if candidate in by_name:
+            return by_name[candidate]
+    raise ValueError(f"Could not find any of {candidates} in CSV columns {list(columns)}")
+
+
+def parse_amounts(values: pd.Series) -> pd.Series:
+    text = values.astype(str).str.strip()
+    # Accounting style "(12.50)" means -12.50
+    negative = text.str.startswith("(") & text.str.endswith(")")
+    text = text.str.replace(r'[\$,\s()]', '', regex=True)
+    amounts = pd.to_numeric(text, errors="coerce")
+    return amounts.where(~negative, -amounts)
+
+
+def parse_descriptions(values: pd.Series) -> pd.Series:
+    return values.fillna("").astype(str).str.replace(r'\s+', ' ', regex=True).str.strip()
+
+
+class CSVImporter:
+    """Streams a bank CSV export into a BudgetAdvisor in fixed-size chunks."""
+
+    def __init__(self, advisor: BudgetAdvisor, classifier=None, chunksize: int = 50_000,
+                 debits_negative: bool = False, default_category: str = "other"):
+        self.advisor = advisor
+        self.classifier = classifier
+        self.chunksize = chunksize
+        self.debits_negative = debits_negative
+        self.default_category = default_category
+        self._categories: Dict[str, str] = {}
+
+    def _categorize(self, descriptions: pd.Series) -> List[str]:
+        # Each distinct description is categorized once for the whole import;
+        # an empty one has nothing to classify
+        self._categories.setdefault("", self.default_category)
+        new = [d for d in descriptions.unique() if d not in self._categories]
+        if new:
+            if self.classifier is not None:
+                categories = self.classifier.categorize_batch(new, corrections=self.advisor.category_corrections)
+            else:
+                categories = [self.default_category] * len(new)
+            self._categories.update(zip(new, categories))
+        return descriptions.map(self._categories).tolist()
+
+    def import_file(self, path: str, date_column: str = None, amount_column: str = None,
+                    description_column: str = None, date_format: str = None,
+                    progress: Callable[[Dict], None] = None) -> Dict:
+        stats = {"rows_read": 0, "rows_imported": 0, "rows_skipped": 0, "elapsed_s": 0.0, "rows_per_sec": 0.0}
+        start = time.perf_counter()
+        columns = None
+
+        for chunk in pd.read_csv(path, chunksize=self.chunksize, dtype=str, keep_default_na=False):
+            if columns is None:
+                columns = (
+                    _find_column(chunk.columns, DATE_COLUMNS, date_column),
+                    _find_column(chunk.columns, AMOUNT_COLUMNS, amount_column),
+                    _find_column(chunk.columns, DESCRIPTION_COLUMNS, description_column)
+                )
+            date_col, amount_col, description_col = columns
+
+            dates = pd.to_datetime(chunk[date_col], format=date_format, errors="coerce")
+            amounts = parse_amounts(chunk[amount_col])
+            if self.debits_negative:
+                amounts = -amounts
+            descriptions = parse_descriptions(chunk[description_col])
+
+            valid = dates.notna() & amounts.notna() & (amounts > 0)
+            dates, amounts, descriptions = dates[valid], amounts[valid], descriptions[valid]
+
+            if len(amounts):
+                self.advisor.add_expenses(
+                    amounts.to_numpy(dtype=np.float64),
+                    descriptions.tolist(),
+                    self._categorize(descriptions),
+                    dates.to_numpy(dtype="datetime64[us]")
+                )
+
+            stats["rows_read"] += len(chunk)
+            stats["rows_imported"] += int(valid.sum())
+            stats["rows_skipped"] = stats["rows_read"] - stats["rows_imported"]
+            stats["elapsed_s"] = time.perf_counter() - start
+            stats["rows_per_sec"] = stats["rows_read"] / stats["elapsed_s"] if stats["elapsed_s"] else 0.0
+            if progress is not None:
+                progress(dict(stats))
+
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a bank CSV export into the expense ledger")
+    parser.add_argument("path")
+    parser.add_argument("--storage", default="sqlite:finance.db")
+    parser.add_argument("--user-id", default="default")
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    parser.add_argument("--date-format", default=None)
+    parser.add_argument("--debits-negative", action="store_true",
+                        help="Expenses are negative amounts; positive rows (credits) are skipped")
+    parser.add_argument("--categorize", action="store_true",
+                        help="Categorize descriptions with the zero-shot model instead of using 'other'")
+    args = parser.parse_args()
+
+    classifier = None
+    if args.categorize:
+        from intent_classifier import IntentClassifier
+        classifier = IntentClassifier()
+
+    advisor = BudgetAdvisor(storage=args.storage, user_id=args.user_id)
+    importer = CSVImporter(advisor, classifier, chunksize=args.chunksize, debits_negative=args.debits_negative)
+
+    def report(stats):
+        print(f"\r{stats['rows_read']:,} rows read, {stats['rows_imported']:,} imported "
+              f"({stats['rows_per_sec']:,.0f} rows/s)", end="", flush=True)
+
+    stats = importer.import_file(args.path, date_format=args.date_format, progress=report)
+    print(f"\nDone in {stats['elapsed_s']:.1f}s: {stats['rows_imported']:,} expenses imported, "
+          f"{stats['rows_skipped']:,} skipped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+import os
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional
+import numpy as np
+from snapshot import load_column, load_strings, read_manifest, save_column, save_strings, write_manifest
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+BYTES_PER_ROW = 8 + 8 + 2 + 4 + 1  # amount, timestamp, category code, description code, deleted flag
+COLUMNS = {
+    "amount": ("_amounts", np.float64),
+    "timestamp": ("_timestamps", "datetime64[us]"),
+    "category_code": ("_category_codes", np.int16),
+    "description_code": ("_description_codes", np.int32),
+    "deleted": ("_deleted", bool)
+}
+EARLIEST = np.datetime64("0001-01-01", "us")
+
+
+class ExpenseLedger:
+    """Columnar, append-mostly expense storage.
+
+    Each row costs BYTES_PER_ROW = 23 bytes of column data: float64 amount,
+    datetime64[us] timestamp, int16 category code, int32 code into the
+    interned description table and a bool tombstone. A million expenses is
+    ~23 MB of columns, plus one copy of each distinct description string.
+    Capacity doubles, so the columns hold at most 2x that, and a doubling
+    briefly holds the old and new columns together (up to 3x). Ids are row
+    numbers + 1 and stay stable across deletes.
+    """
+
+    def __init__(self, categories: List[str] = None, capacity: int = 1024):
+        self._size = 0
+        self._live = 0
+        self._amounts = np.empty(capacity, dtype=np.float64)
+        self._timestamps = np.empty(capacity, dtype="datetime64[us]")
+        self._category_codes = np.empty(capacity, dtype=np.int16)
+        self._description_codes = np.empty(capacity, dtype=np.int32)
+        self._deleted = np.zeros(capacity, dtype=bool)
+
+        self.categories: List[str] = []
+        self._category_index: Dict[str, int] = {}
+        for category in categories or []:
+            self._category_code(category)
+        self.descriptions: List[str] = []
+        self._description_index: Dict[str, int] = {}
+
+        # Row order is time order as long as rows arrive chronologically (the
+        # chat case). Otherwise a (time, id) permutation and its inverse are
+        # built lazily for the recent/page queries.
+        self._chronological = True
+        self._latest = EARLIEST
+        self._order: Optional[np.ndarray] = None
+        self._rank: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return self._live
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self._columns())
+
+    def _columns(self):
+        return (self._amounts, self._timestamps, self._category_codes, self._description_codes, self._deleted)
+
+    def _reserve(self, extra: int):
+        needed = self._size + extra
+        capacity = len(self._amounts)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ("_amounts", "_timestamps", "_category_codes", "_description_codes", "_deleted"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype) if name == "_deleted" else np.empty(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def _category_code(self, category: str) -> int:
+        code = self._category_index.get(category)
+        if code is None:
+            code = len(self.categories)
+            self.categories.append(category)
+            self._category_index[category] = code
+        return code
+
+    def _description_code(self, description: str) -> int:
+        if self._description_index is None:
+            # Opened from a snapshot: index the mapped strings on first write
+            self._description_index = {value: code for code, value in enumerate(self.descriptions)}
+        code = self._description_index.get(description)
+        if code is None:
+            code = len(self.descriptions)
+            self.descriptions.append(description)
+            self._description_index[description] = code
+        return code
+
+    def append(self, amount: float, description: str, category: str, date: datetime) -> int:
+        self._reserve(1)
+        row = self._size
+        self._amounts[row] = amount
+        self._timestamps[row] = np.datetime64(date, "us")
+        self._category_codes[row] = self._category_code(category)
+        self._description_codes[row] = self._description_code(description)
+        self._size += 1
+        self._live += 1
+        self._track_order(row, self._size)
+        return row + 1
+
+    def extend(self, amounts, descriptions: List[str], categories: List[str], dates) -> range:
+        count = len(amounts)
+        self._reserve(count)
+        start, end = self._size, self._size + count
+        self._amounts[start:end] = np.asarray(amounts, dtype=np.float64)
+        self._timestamps[start:end] = np.asarray(dates, dtype="datetime64[us]")
+        self._category_codes[start:end] = [self._category_code(category) for category in categories]
+        self._description_codes[start:end] = [self._description_code(description) for description in descriptions]
+        self._size = end
+        self._live += count
+        self._track_order(start, end)
+        return range(start + 1, end + 1)
+
+    def _track_order(self, start: int, end: int):
+        if start == end:
+            return
+        timestamps = self._timestamps[start:end]
+        in_order = timestamps[0] >= self._latest and bool(np.all(timestamps[1:] >= timestamps[:-1]))
+        if not in_order:
+            self._chronological = False
+            self._order = self._rank = None
+        elif self._order is not None:
+            # New rows all sort after everything already ordered
+            self._order = np.concatenate([self._order, np.arange(start, end)])
+            self._rank = np.concatenate([self._rank, np.arange(start, end)])
+        self._latest = max(self._latest, timestamps.max())
+
+    def _time_order(self) -> Optional[np.ndarray]:
+        if self._chronological:
+            return None
+        if self._order is None:
+            self._order = np.argsort(self._timestamps[:self._size], kind="stable")
+            self._rank = np.empty_like(self._order)
+            self._rank[self._order] = np.arange(self._size)
+        return self._order
+
+    def _walk_back(self, position: int, limit: int) -> List[Dict]:
+        order = self._time_order()
+        records = []
+        while position >= 0 and len(records) < limit:
+            row = position if order is None else order[position]
+            if not self._deleted[row]:
+                records.append(self._record(row))
+            position -= 1
+        return records
+
+    def recent(self, limit: int) -> List[Dict]:
+        return self._walk_back(self._size - 1, limit)
+
+    def page(self, limit: int, before_id: int = None) -> List[Dict]:
+        """Up to `limit` expenses older than `before_id` in (date, id) order, newest first."""
+        if before_id is None:
+            return self.recent(limit)
+        row = before_id - 1
+        if not 0 <= row < self._size:
+            return []
+        order = self._time_order()
+        position = row if order is None else int(self._rank[row])
+        return self._walk_back(position - 1, limit)
+
+    def _row(self, expense_id: int) -> Optional[int]:
+        row = expense_id - 1
+        if 0 <= row < self._size and not self._deleted[row]:
+            return row
+        return None
+
+    def _record(self, row: int) -> Dict:
+        date = self._timestamps[row].astype(datetime)
+        return {
+            "id": row + 1,
+            "amount": float(self._amounts[row]),
+            "description": self.descriptions[self._description_codes[row]],
+            "category": self.categories[self._category_codes[row]],
+            "date": date,
+            "month": date.strftime("%Y-%m")
+        }
+
+    def get(self, expense_id: int) -> Optional[Dict]:
+        row = self._row(expense_id)
+        return None if row is None else self._record(row)
+
+    def update(self, expense_id: int, amount: float = None, description: str = None,
+               category: str = None) -> Optional[Dict]:
+        row = self._row(expense_id)
+        if row is None:
+            return None
+        if amount is not None:
+            self._amounts[row] = amount
+        if description is not None:
+            self._description_codes[row] = self._description_code(description)
+        if category is not None:
+            self._category_codes[row] = self._category_code(category)
+        return self._record(row)
+
+    def delete(self, expense_id: int) -> Optional[Dict]:
+        row = self._row(expense_id)
+        if row is None:
+            return None
+        self._deleted[row] = True
+        self._live -= 1
+        return self._record(row)
+
+    def records(self) -> List[Dict]:
+        return [self._record(row) for row in np.flatnonzero(~self._deleted[:self._size])]
+
+    def mask(self, month: str = None, category: str = None, start: int = 0, end: int = None) -> np.ndarray:
+        """Live rows of start..end matching month and category."""
+        end = self._size if end is None else end
+        mask = ~self._deleted[start:end]
+        if month is not None:
+            first = np.datetime64(month, "M")
+            timestamps = self._timestamps[start:end]
+            mask &= (timestamps >= first) & (timestamps < first + 1)
+        if category is not None:
+            code = self._category_index.get(category)
+            if code is None:
+                return np.zeros(end - start, dtype=bool)
+            mask &= self._category_codes[start:end] == code
+        return mask
+
+    def _month_bounds(self, month: str):
+        timestamps = self._timestamps[:self._size]
+        first = np.datetime64(month, "M")
+        return tuple(int(i) for i in np.searchsorted(timestamps, [first, first + 1]))
+
+    def to_frame(self, month: str = None, category: str = None) -> "pd.DataFrame":
+        import pandas as pd
+        start, end = 0, self._size
+        if month is not None and self._chronological:
+            # Rows are in time order: the month is one contiguous slice
+            start, end = self._month_bounds(month)
+            month = None
+        amounts = self._amounts[start:end]
+        timestamps = self._timestamps[start:end]
+        category_codes = self._category_codes[start:end]
+        description_codes = self._description_codes[start:end]
+        ids = np.arange(start + 1, end + 1)
+
+        if month is not None or category is not None or self._live != self._size:
+            rows = self.mask(month, category, start, end)
+            amounts, timestamps, ids = amounts[rows], timestamps[rows], ids[rows]
+            category_codes, description_codes = category_codes[rows], description_codes[rows]
+
+        # Months as a categorical over the covered range: one vectorized pass,
+        # no per-row string formatting.
+        month_numbers = timestamps.astype("datetime64[M]").astype(np.int64)
+        first_month = month_numbers.min() if len(month_numbers) else 0
+        last_month = month_numbers.max() if len(month_numbers) else -1
+        month_labels = np.arange(first_month, last_month + 1).astype("datetime64[M]").astype(str)
+
+        # Unsliced, undeleted columns are handed to pandas without copying
+        return pd.DataFrame({
+            "id": ids,
+            "amount": amounts,
+            "description": pd.Categorical.from_codes(description_codes, list(self.descriptions), validate=False),
+            "category": pd.Categorical.from_codes(category_codes, self.categories, validate=False),
+            "date": timestamps,
+            "month": pd.Categorical.from_codes(month_numbers - first_month, month_labels, validate=False)
+        }, copy=False)
+
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        for name, (attr, _) in COLUMNS.items():
+            save_column(directory, name, getattr(self, attr)[:self._size])
+        save_strings(directory, "descriptions", self.descriptions)
+        write_manifest(directory, "expense_ledger", {
+            "rows": self._size,
+            "live": self._live,
+            "categories": list(self.categories),
+            "chronological": self._chronological,
+            "latest": str(self._latest)
+        })
+
+    @classmethod
+    def open(cls, directory: str) -> "ExpenseLedger":
+        """Open a saved ledger with its columns memory-mapped.
+
+        Opening reads only the manifest; column pages are read when a query
+        touches them. Updates and deletes stay copy-on-write in memory, and
+        the first append copies the columns into growable arrays.
+        """
+        manifest = read_manifest(directory, "expense_ledger")
+        rows = manifest["rows"]
+        ledger = cls(categories=manifest["categories"], capacity=1)
+        if not rows:
+            return ledger
+        for name, (attr, dtype) in COLUMNS.items():
+            setattr(ledger, attr, load_column(directory, name, rows, dtype))
+        ledger._size = rows
+        ledger._live = manifest["live"]
+        ledger.descriptions = load_strings(directory, "descriptions")
+        ledger._description_index = None
+        ledger._chronological = manifest["chronological"]
+        ledger._latest = np.datetime64(manifest["latest"], "us")
+        return ledger
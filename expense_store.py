@@ -0,0 +1,410 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+import numpy as np
+from expense_ledger import ExpenseLedger
+from rollup_cube import RollupCube
+from snapshot import read_manifest, write_manifest
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def _summary_from_totals(totals: Dict[str, tuple]) -> Dict:
+    total = sum(amount for amount, _ in totals.values())
+    count = sum(count for _, count in totals.values())
+    return {
+        "total": total,
+        "by_category": {category: amount for category, (amount, _) in totals.items()},
+        "transaction_count": count,
+        "average_transaction": total / count if count > 0 else 0
+    }
+
+
+class ExpenseStore:
+    """Storage backend interface for BudgetAdvisor."""
+
+    def add(self, amount: float, description: str, category: str, date: datetime) -> Dict:
+        raise NotImplementedError
+
+    def add_many(self, amounts, descriptions: List[str], categories: List[str], dates) -> int:
+        raise NotImplementedError
+
+    def get(self, expense_id: int) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def update(self, expense_id: int, amount: float = None, description: str = None,
+               category: str = None) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def delete(self, expense_id: int) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def records(self) -> List[Dict]:
+        raise NotImplementedError
+
+    def monthly_summary(self, month: str) -> Dict:
+        raise NotImplementedError
+
+    def monthly_totals(self) -> List[Tuple[str, str, float, int]]:
+        """(month, category, total, count) for every month and category with expenses."""
+        raise NotImplementedError
+
+    def rollup_cube(self) -> Optional[RollupCube]:
+        """The store's own month x category cube, kept current by its writes, if it keeps one."""
+        return None
+
+    def page(self, limit: int, before: Tuple[datetime, int] = None) -> List[Dict]:
+        """Up to `limit` expenses ordered by (date, id) descending, strictly before the `before` cursor."""
+        raise NotImplementedError
+
+    def to_frame(self, month: str = None, category: str = None) -> "pd.DataFrame":
+        raise NotImplementedError
+
+    def load_budgets(self) -> Optional[Tuple[Dict[str, float], float]]:
+        return None
+
+    def save_budgets(self, budgets: Dict[str, float], total_budget: float):
+        pass
+
+    def load_category_corrections(self) -> Dict[str, str]:
+        return {}
+
+    def save_category_correction(self, description: str, category: str):
+        pass
+
+    def close(self):
+        pass
+
+
+class MemoryExpenseStore(ExpenseStore):
+    def __init__(self, categories: List[str] = None, ledger: ExpenseLedger = None):
+        self.ledger = ledger or ExpenseLedger(categories=categories)
+        # Month x category totals and counts behind both summaries and trends
+        self.rollup = RollupCube(self.ledger.categories)
+
+    def add(self, amount: float, description: str, category: str, date: datetime) -> Dict:
+        expense_id = self.ledger.append(amount, description, category, date)
+        self.rollup.add(date.strftime("%Y-%m"), category, amount)
+        return self.ledger.get(expense_id)
+
+    def add_many(self, amounts, descriptions: List[str], categories: List[str], dates) -> int:
+        ids = self.ledger.extend(amounts, descriptions, categories, dates)
+        self.rollup.add_many(dates, categories, amounts)
+        return len(ids)
+
+    def get(self, expense_id: int) -> Optional[Dict]:
+        return self.ledger.get(expense_id)
+
+    def update(self, expense_id: int, amount: float = None, description: str = None,
+               category: str = None) -> Optional[Dict]:
+        old = self.ledger.get(expense_id)
+        if old is None:
+            return None
+        expense = self.ledger.update(expense_id, amount=amount, description=description, category=category)
+        self.rollup.remove(old["month"], old["category"], old["amount"])
+        self.rollup.add(expense["month"], expense["category"], expense["amount"])
+        return expense
+
+    def delete(self, expense_id: int) -> Optional[Dict]:
+        expense = self.ledger.delete(expense_id)
+        if expense is not None:
+            self.rollup.remove(expense["month"], expense["category"], expense["amount"])
+        return expense
+
+    def count(self) -> int:
+        return len(self.ledger)
+
+    def records(self) -> List[Dict]:
+        return self.ledger.records()
+
+    def monthly_summary(self, month: str) -> Dict:
+        return _summary_from_totals(self.rollup.month_totals(month))
+
+    def monthly_totals(self) -> List[Tuple[str, str, float, int]]:
+        return self.rollup.rows()
+
+    def rollup_cube(self) -> Optional[RollupCube]:
+        return self.rollup
+
+    def page(self, limit: int, before: Tuple[datetime, int] = None) -> List[Dict]:
+        # The id alone pins the cursor row; the ledger knows its time position
+        return self.ledger.page(limit, before_id=None if before is None else before[1])
+
+    def to_frame(self, month: str = None, category: str = None) -> "pd.DataFrame":
+        return self.ledger.to_frame(month=month, category=category)
+
+    def save(self, directory: str):
+        self.ledger.save(os.path.join(directory, "ledger"))
+        # The per-month totals are saved too, so opening never scans the rows
+        write_manifest(directory, "memory_expense_store", {"monthly_totals": self.rollup.rows()})
+
+    @classmethod
+    def open(cls, directory: str) -> "MemoryExpenseStore":
+        manifest = read_manifest(directory, "memory_expense_store")
+        store = cls(ledger=ExpenseLedger.open(os.path.join(directory, "ledger")))
+        store.rollup.load(manifest["monthly_totals"])
+        return store
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS expenses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    amount REAL NOT NULL,
+    description TEXT NOT NULL,
+    category TEXT NOT NULL,
+    date TEXT NOT NULL,
+    month TEXT NOT NULL
+);
+-- amount is carried in the index so monthly aggregates never touch the table
+CREATE INDEX IF NOT EXISTS idx_expenses_user_month_category
+    ON expenses (user_id, month, category, amount);
+CREATE INDEX IF NOT EXISTS idx_expenses_user_date
+    ON expenses (user_id, date, id);
+CREATE TABLE IF NOT EXISTS budgets (
+    user_id TEXT NOT NULL,
+    category TEXT NOT NULL,
+    amount REAL NOT NULL,
+    PRIMARY KEY (user_id, category)
+);
+CREATE TABLE IF NOT EXISTS budget_totals (
+    user_id TEXT PRIMARY KEY,
+    total_budget REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS category_corrections (
+    user_id TEXT NOT NULL,
+    description TEXT NOT NULL,
+    category TEXT NOT NULL,
+    PRIMARY KEY (user_id, description)
+);
+"""
+
+# Fixed-width timestamps so text order is chronological order
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+class SQLiteExpenseStore(ExpenseStore):
+    def __init__(self, path: str = ":memory:", user_id: str = "default", connection: sqlite3.Connection = None,
+                 lock: threading.RLock = None):
+        self.path = path
+        self.user_id = user_id
+        self._lock = lock or threading.RLock()
+        self._owns_connection = connection is None
+        if connection is None:
+            # Streamlit runs each session on its own thread; access is serialized by self._lock
+            connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+        self.conn = connection
+
+    def for_user(self, user_id: str) -> "SQLiteExpenseStore":
+        return SQLiteExpenseStore(self.path, user_id, connection=self.conn, lock=self._lock)
+
+    def _row_to_expense(self, row) -> Dict:
+        expense_id, amount, description, category, date, month = row
+        return {
+            "id": expense_id,
+            "amount": amount,
+            "description": description,
+            "category": category,
+            "date": datetime.fromisoformat(date),
+            "month": month
+        }
+
+    def add(self, amount: float, description: str, category: str, date: datetime) -> Dict:
+        with self._lock:
+            cursor = self.conn.execute(
+                "INSERT INTO expenses (user_id, amount, description, category, date, month) VALUES (?, ?, ?, ?, ?, ?)",
+                (self.user_id, amount, description, category, date.strftime(DATE_FORMAT), date.strftime("%Y-%m"))
+            )
+            expense_id = cursor.lastrowid
+        return {
+            "id": expense_id,
+            "amount": amount,
+            "description": description,
+            "category": category,
+            "date": date,
+            "month": date.strftime("%Y-%m")
+        }
+
+    def add_many(self, amounts, descriptions: List[str], categories: List[str], dates) -> int:
+        import pandas as pd
+        dates = pd.DatetimeIndex(dates)
+        rows = zip(
+            (self.user_id for _ in range(len(dates))),
+            (float(amount) for amount in amounts),
+            descriptions,
+            categories,
+            dates.strftime(DATE_FORMAT),
+            dates.strftime("%Y-%m")
+        )
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.executemany(
+                    "INSERT INTO expenses (user_id, amount, description, category, date, month) VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return len(dates)
+
+    def get(self, expense_id: int) -> Optional[Dict]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT id, amount, description, category, date, month FROM expenses WHERE id = ? AND user_id = ?",
+                (expense_id, self.user_id)
+            ).fetchone()
+        return None if row is None else self._row_to_expense(row)
+
+    def update(self, expense_id: int, amount: float = None, description: str = None,
+               category: str = None) -> Optional[Dict]:
+        changes = {"amount": amount, "description": description, "category": category}
+        changes = {column: value for column, value in changes.items() if value is not None}
+        with self._lock:
+            if changes:
+                assignments = ", ".join(f"{column} = ?" for column in changes)
+                self.conn.execute(
+                    f"UPDATE expenses SET {assignments} WHERE id = ? AND user_id = ?",
+                    (*changes.values(), expense_id, self.user_id)
+                )
+            return self.get(expense_id)
+
+    def delete(self, expense_id: int) -> Optional[Dict]:
+        with self._lock:
+            expense = self.get(expense_id)
+            if expense is not None:
+                self.conn.execute("DELETE FROM expenses WHERE id = ? AND user_id = ?", (expense_id, self.user_id))
+        return expense
+
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM expenses WHERE user_id = ?", (self.user_id,)).fetchone()[0]
+
+    def records(self) -> List[Dict]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT id, amount, description, category, date, month FROM expenses WHERE user_id = ? ORDER BY id",
+                (self.user_id,)
+            ).fetchall()
+        return [self._row_to_expense(row) for row in rows]
+
+    def monthly_summary(self, month: str) -> Dict:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT category, SUM(amount), COUNT(*) FROM expenses "
+                "WHERE user_id = ? AND month = ? GROUP BY category",
+                (self.user_id, month)
+            ).fetchall()
+        return _summary_from_totals({category: (total, count) for category, total, count in rows})
+
+    def monthly_totals(self) -> List[Tuple[str, str, float, int]]:
+        with self._lock:
+            return self.conn.execute(
+                "SELECT month, category, SUM(amount), COUNT(*) FROM expenses WHERE user_id = ? GROUP BY month, category",
+                (self.user_id,)
+            ).fetchall()
+
+    def page(self, limit: int, before: Tuple[datetime, int] = None) -> List[Dict]:
+        query = "SELECT id, amount, description, category, date, month FROM expenses WHERE user_id = ?"
+        params = [self.user_id]
+        if before is not None:
+            query += " AND (date, id) < (?, ?)"
+            params += [before[0].strftime(DATE_FORMAT), before[1]]
+        query += " ORDER BY date DESC, id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return [self._row_to_expense(row) for row in rows]
+
+    def to_frame(self, month: str = None, category: str = None) -> "pd.DataFrame":
+        import pandas as pd
+        query = "SELECT id, amount, description, category, date, month FROM expenses WHERE user_id = ?"
+        params = [self.user_id]
+        if month is not None:
+            query += " AND month = ?"
+            params.append(month)
+        if category is not None:
+            query += " AND category = ?"
+            params.append(category)
+        with self._lock:
+            df = pd.read_sql_query(query + " ORDER BY id", self.conn, params=params)
+        df["date"] = pd.to_datetime(df["date"])
+        return df
+
+    def load_budgets(self) -> Optional[Tuple[Dict[str, float], float]]:
+        with self._lock:
+            rows = self.conn.execute("SELECT category, amount FROM budgets WHERE user_id = ?", (self.user_id,)).fetchall()
+            total = self.conn.execute(
+                "SELECT total_budget FROM budget_totals WHERE user_id = ?", (self.user_id,)
+            ).fetchone()
+        if not rows:
+            return None
+        budgets = dict(rows)
+        return budgets, total[0] if total else sum(budgets.values())
+
+    def save_budgets(self, budgets: Dict[str, float], total_budget: float):
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO budgets (user_id, category, amount) VALUES (?, ?, ?)",
+                    [(self.user_id, category, amount) for category, amount in budgets.items()]
+                )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO budget_totals (user_id, total_budget) VALUES (?, ?)",
+                    (self.user_id, total_budget)
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def load_category_corrections(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self.conn.execute(
+                "SELECT description, category FROM category_corrections WHERE user_id = ?", (self.user_id,)
+            ).fetchall())
+
+    def save_category_correction(self, description: str, category: str):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO category_corrections (user_id, description, category) VALUES (?, ?, ?)",
+                (self.user_id, description, category)
+            )
+
+    def daily_totals_by_user(self, month: str) -> List[Tuple[str, str, int, float]]:
+        """(user_id, category, day of month, total) for every user in the database."""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT user_id, category, CAST(substr(date, 9, 2) AS INTEGER), SUM(amount) FROM expenses "
+                "WHERE month = ? GROUP BY user_id, category, substr(date, 9, 2)",
+                (month,)
+            ).fetchall()
+
+    def budgets_by_user(self) -> List[Tuple[str, str, float]]:
+        """(user_id, category, amount) for every user who changed a budget."""
+        with self._lock:
+            return self.conn.execute("SELECT user_id, category, amount FROM budgets").fetchall()
+
+    def close(self):
+        if self._owns_connection:
+            with self._lock:
+                self.conn.close()
+
+
+def open_store(storage: str = "memory", user_id: str = "default", categories: List[str] = None) -> ExpenseStore:
+    if storage == "memory":
+        return MemoryExpenseStore(categories=categories)
+    if storage.startswith("sqlite:"):
+        return SQLiteExpenseStore(storage[len("sqlite:"):] or ":memory:", user_id=user_id)
+    raise ValueError(f"Unknown storage '{storage}'. Use 'memory' or 'sqlite:<path>'.")
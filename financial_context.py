@@ -0,0 +1,88 @@
+import mmap
+import os
+import threading
+from typing import Dict, List
+import numpy as np
+
+DEFAULT_DATASET = "takala/financial_phrasebank"
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "personal-finance-chatbot", "financial_phrasebank")
+LABELS = {0: "negative", 1: "neutral", 2: "positive"}
+
+
+class FinancialContext:
+    """Financial phrasebank sentences grouped by sentiment, loaded on first access.
+
+    The first load downloads the dataset once and writes a compact cache:
+    all sentences as one UTF-8 blob plus int64 offsets and int8 labels.
+    Later loads memory-map those files instead of touching the network.
+    """
+
+    def __init__(self, dataset: str = DEFAULT_DATASET, cache_dir: str = DEFAULT_CACHE_DIR):
+        self.dataset = dataset
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._text = None
+        self._offsets = None
+        self._indices: Dict[str, np.ndarray] = {name: np.empty(0, dtype=np.int64) for name in LABELS.values()}
+
+    def __getitem__(self, label: str) -> List[str]:
+        return self.sentences(label)
+
+    def keys(self):
+        return LABELS.values()
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return 0 if self._offsets is None else len(self._offsets) - 1
+
+    def sentences(self, label: str) -> List[str]:
+        self._ensure_loaded()
+        return [self._sentence(i) for i in self._indices[label]]
+
+    def _sentence(self, index: int) -> str:
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return self._text[start:end].decode("utf-8")
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                if not os.path.exists(self._path("labels.npy")):
+                    self._build_cache()
+                self._open_cache()
+            except Exception as e:
+                print(f"Warning: Could not load financial dataset: {e}")
+            self._loaded = True
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, name)
+
+    def _build_cache(self):
+        from datasets import load_dataset
+
+        dataset = load_dataset(self.dataset, split="train")
+        blob = bytearray()
+        offsets = [0]
+        labels = []
+        for item in dataset:
+            blob += item['sentence'].encode("utf-8")
+            offsets.append(len(blob))
+            labels.append(item['label'])
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self._path("text.bin"), "wb") as f:
+            f.write(blob)
+        np.save(self._path("offsets.npy"), np.asarray(offsets, dtype=np.int64))
+        # labels.npy is written last: its presence marks a complete cache
+        np.save(self._path("labels.npy"), np.asarray(labels, dtype=np.int8))
+
+    def _open_cache(self):
+        with open(self._path("text.bin"), "rb") as f:
+            self._text = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+        self._offsets = np.load(self._path("offsets.npy"), mmap_mode="r")
+        labels = np.load(self._path("labels.npy"), mmap_mode="r")
+        self._indices = {name: np.flatnonzero(labels == code) for code, name in LABELS.items()}
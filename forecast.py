@@ -0,0 +1,97 @@
+import calendar
+from datetime import datetime
+from typing import Dict, List, Tuple
+import numpy as np
+
+RECENT_DAYS = 7
+RECENT_WEIGHT = 0.5
+
+
+def days_in_month(month: str) -> int:
+    year, mon = month.split("-")
+    return calendar.monthrange(int(year), int(mon))[1]
+
+
+def month_to_date(month: str = None, day: int = None) -> Tuple[str, int]:
+    """The month to forecast and how many of its days have elapsed: today
+    for the current month, all of them for a past one."""
+    now = datetime.now()
+    month = month or now.strftime("%Y-%m")
+    if day is None:
+        day = now.day if month == now.strftime("%Y-%m") else days_in_month(month)
+    return month, day
+
+
+def daily_spend(codes: np.ndarray, days: np.ndarray, amounts: np.ndarray, shape: Tuple[int, ...],
+                dtype=np.float32) -> np.ndarray:
+    """Sum amounts into a dense (..., days-in-month) array.
+
+    codes are row numbers into the leading dimensions already flattened
+    (e.g. user * categories + category) and days are 1-based days of month.
+    """
+    cells = np.asarray(codes, dtype=np.int64) * shape[-1] + np.asarray(days, dtype=np.int64) - 1
+    totals = np.bincount(cells, weights=np.asarray(amounts, dtype=np.float64), minlength=int(np.prod(shape)))
+    return totals.astype(dtype, copy=False).reshape(shape)
+
+
+class DailyTotals:
+    """Per-category, per-day totals for one month, kept current as expenses change.
+
+    Changes outside the month, or to categories it does not track, are
+    ignored, so every update is a single cell.
+    """
+
+    def __init__(self, month: str, categories: List[str]):
+        self.month = month
+        self.categories = list(categories)
+        self._columns = {category: i for i, category in enumerate(self.categories)}
+        self._first_day = np.datetime64(month, "D")
+        self.totals = np.zeros((len(self.categories), days_in_month(month)))
+
+    def add(self, category: str, date: datetime, amount: float):
+        row = self._columns.get(category)
+        day = (np.datetime64(date, "D") - self._first_day).astype(np.int64)
+        if row is not None and 0 <= day < self.totals.shape[1]:
+            self.totals[row, day] += amount
+
+    def add_many(self, dates, categories: List[str], amounts):
+        days = (np.asarray(dates, dtype="datetime64[D]") - self._first_day).astype(np.int64)
+        names, inverse = np.unique(np.asarray(categories, dtype=str), return_inverse=True)
+        rows = np.array([self._columns.get(str(name), -1) for name in names], dtype=np.int64)[inverse]
+        keep = (rows >= 0) & (days >= 0) & (days < self.totals.shape[1])
+        np.add.at(self.totals, (rows[keep], days[keep]), np.asarray(amounts, dtype=np.float64)[keep])
+
+
+def forecast_month_end(daily: np.ndarray, day: int, budgets=None, recent_days: int = RECENT_DAYS,
+                       recent_weight: float = RECENT_WEIGHT) -> Dict[str, np.ndarray]:
+    """Project month-end totals from daily spend curves.
+
+    daily is (..., days-in-month) with days after `day` (today, 1-based)
+    ignored; the leading dimensions can be categories or users x categories.
+    The daily pace blends the month-to-date average with the last
+    `recent_days` days, and is extrapolated over the rest of the month.
+    budgets broadcasts against the leading dimensions.
+    """
+    total_days = daily.shape[-1]
+    day = min(max(day, 1), total_days)
+    elapsed = daily[..., :day]
+    spent = elapsed.sum(axis=-1)
+    window = min(day, recent_days)
+    recent = elapsed[..., day - window:].sum(axis=-1) / window
+    rate = recent_weight * recent + (1 - recent_weight) * spent / day
+    projected = spent + rate * (total_days - day)
+    result = {"spent": spent, "daily_rate": rate, "projected": projected, "day": day, "days": total_days}
+    if budgets is not None:
+        budgets = np.asarray(budgets, dtype=projected.dtype)
+        result["budget"] = budgets
+        result["overspend"] = np.maximum(projected - budgets, 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result["projected_pct"] = np.where(budgets > 0, projected / budgets * 100, 0)
+    return result
+
+
+def overspending(forecast: Dict[str, np.ndarray], categories: List[str]) -> List[Tuple[str, float, float, float]]:
+    """(category, overspend, projected, budget) for one user's projected overspends, largest first."""
+    rows = [(category, float(forecast["overspend"][i]), float(forecast["projected"][i]), float(forecast["budget"][i]))
+            for i, category in enumerate(categories) if forecast["overspend"][i] > 0]
+    return sorted(rows, key=lambda row: row[1], reverse=True)
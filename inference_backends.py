@@ -0,0 +1,231 @@
+import argparse
+import json
+import mmap
+import os
+import statistics
+import time
+from typing import Dict, List
+
+DEFAULT_MODEL = "facebook/bart-large-mnli"
+DEFAULT_TASK = "zero-shot-classification"
+DEFAULT_BACKEND = "torch"
+DEFAULT_ARTIFACTS_DIR = "artifacts"
+BACKENDS = ("torch", "int8", "onnx", "mmap")
+
+QUANTIZED_WEIGHTS = "quantized_int8.pt"
+SNAPSHOT_WEIGHTS = "model.safetensors"
+SAFETENSORS_DTYPES = {
+    "F64": "float64", "F32": "float32", "F16": "float16", "BF16": "bfloat16",
+    "I64": "int64", "I32": "int32", "I16": "int16", "I8": "int8", "U8": "uint8", "BOOL": "bool"
+}
+
+# Fixed message set for comparing backends against the fp32 reference
+EVAL_MESSAGES = [
+    "I spent $25 on pizza delivery",
+    "Grabbed sushi with friends for $32",
+    "Paid $60 for my gym membership",
+    "Took a $18 ride home from the airport",
+    "$45 for concert tickets tonight",
+    "New running shoes were $120",
+    "Dentist copay was $40",
+    "Booked a hotel in Denver for $210",
+    "How much have I spent this month?",
+    "Am I doing okay with money?",
+    "Where does most of my money go?",
+    "Change the amount I can spend on travel",
+    "Can you sort my purchases into groups?",
+    "Good evening!",
+    "What can you do?",
+]
+
+
+def artifact_dir(model: str, backend: str, artifacts_dir: str = DEFAULT_ARTIFACTS_DIR) -> str:
+    return os.path.join(artifacts_dir, model.replace("/", "--"), backend)
+
+
+def _quantize(model):
+    import torch
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def export(model: str = DEFAULT_MODEL, backend: str = "onnx", artifacts_dir: str = DEFAULT_ARTIFACTS_DIR) -> str:
+    if backend == "torch":
+        raise ValueError("The torch fp32 backend loads straight from the model hub; nothing to export.")
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+    path = artifact_dir(model, backend, artifacts_dir)
+    os.makedirs(path, exist_ok=True)
+    AutoTokenizer.from_pretrained(model).save_pretrained(path)
+
+    if backend == "mmap":
+        AutoModelForSequenceClassification.from_pretrained(model).save_pretrained(path, safe_serialization=True)
+    elif backend == "int8":
+        fp32 = AutoModelForSequenceClassification.from_pretrained(model)
+        fp32.config.save_pretrained(path)
+        torch.save(_quantize(fp32.eval()).state_dict(), os.path.join(path, QUANTIZED_WEIGHTS))
+    elif backend == "onnx":
+        ORTModelForSequenceClassification = _import_ort_model()
+        ORTModelForSequenceClassification.from_pretrained(model, export=True).save_pretrained(path)
+    else:
+        raise ValueError(f"Unknown backend '{backend}'. Choose from {BACKENDS}.")
+    return path
+
+
+def _import_ort_model():
+    try:
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+    except ImportError as e:
+        raise ImportError("The onnx backend needs optimum[onnxruntime]: pip install 'optimum[onnxruntime]'") from e
+    return ORTModelForSequenceClassification
+
+
+def _mmap_state_dict(path: str) -> Dict:
+    # safetensors layout: u64 header length, JSON header, then raw tensor
+    # bytes. Every tensor is a view into one copy-on-write mapping, so
+    # processes loading the same file share its pages until one writes.
+    import torch
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    header_len = int.from_bytes(buffer[:8], "little")
+    header = json.loads(buffer[8:8 + header_len])
+    header.pop("__metadata__", None)
+    data_start = 8 + header_len
+    state = {}
+    for name, info in header.items():
+        dtype = getattr(torch, SAFETENSORS_DTYPES[info["dtype"]])
+        start, end = info["data_offsets"]
+        count = (end - start) // torch.empty(0, dtype=dtype).element_size()
+        tensor = torch.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + start) if count else \
+            torch.empty(0, dtype=dtype)
+        state[name] = tensor.reshape(info["shape"])
+    return state
+
+
+def _load_mmap_model(path: str):
+    import torch
+    from transformers import AutoConfig, AutoModelForSequenceClassification
+    weights = os.path.join(path, SNAPSHOT_WEIGHTS)
+    if not os.path.exists(weights):
+        raise FileNotFoundError(f"No safetensors snapshot in {path}. Run: python inference_backends.py export --backend mmap")
+    # Build the module tree without allocating weights, then point its
+    # parameters straight at the mapped tensors.
+    with torch.device("meta"):
+        model = AutoModelForSequenceClassification.from_config(AutoConfig.from_pretrained(path))
+    model.load_state_dict(_mmap_state_dict(weights), strict=False, assign=True)
+    model.tie_weights()
+    if any(t.is_meta for t in list(model.parameters()) + list(model.buffers())):
+        print(f"Warning: {weights} does not cover every weight; loading a private copy instead")
+        model = AutoModelForSequenceClassification.from_pretrained(path)
+    return model.eval()
+
+
+def load_pipeline(model: str = DEFAULT_MODEL, backend: str = DEFAULT_BACKEND, task: str = DEFAULT_TASK,
+                  artifacts_dir: str = DEFAULT_ARTIFACTS_DIR):
+    # transformers and torch take seconds to import, so only pay for them
+    # when a model is actually loaded
+    import torch
+    from transformers import AutoConfig, AutoModelForSequenceClassification, AutoTokenizer, pipeline
+    if backend == "torch":
+        return pipeline(task, model=model)
+
+    path = artifact_dir(model, backend, artifacts_dir)
+    if backend == "mmap":
+        # model may also be the snapshot directory itself
+        path = model if os.path.isdir(model) else path
+        return pipeline(task, model=_load_mmap_model(path), tokenizer=AutoTokenizer.from_pretrained(path))
+
+    if backend == "int8":
+        weights = os.path.join(path, QUANTIZED_WEIGHTS)
+        if os.path.exists(weights):
+            # Build the quantized module structure from config, then load the
+            # saved int8 weights; the fp32 checkpoint is never read.
+            tokenizer = AutoTokenizer.from_pretrained(path)
+            quantized = _quantize(AutoModelForSequenceClassification.from_config(AutoConfig.from_pretrained(path)).eval())
+            quantized.load_state_dict(torch.load(weights))
+        else:
+            print(f"Warning: no int8 artifacts in {path}; quantizing {model} at load time")
+            tokenizer = AutoTokenizer.from_pretrained(model)
+            quantized = _quantize(AutoModelForSequenceClassification.from_pretrained(model).eval())
+        return pipeline(task, model=quantized, tokenizer=tokenizer)
+
+    if backend == "onnx":
+        ORTModelForSequenceClassification = _import_ort_model()
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No ONNX export in {path}. Run: python inference_backends.py export --backend onnx")
+        return pipeline(task, model=ORTModelForSequenceClassification.from_pretrained(path),
+                        tokenizer=AutoTokenizer.from_pretrained(path))
+
+    raise ValueError(f"Unknown backend '{backend}'. Choose from {BACKENDS}.")
+
+
+def compare(model: str = DEFAULT_MODEL, backends: List[str] = BACKENDS, artifacts_dir: str = DEFAULT_ARTIFACTS_DIR,
+            repeat: int = 3) -> Dict:
+    from category_cache import CategoryCache
+    from intent_classifier import IntentClassifier
+    from model_registry import ModelRegistry, _process_rss_bytes
+
+    registry = ModelRegistry()
+    report = {}
+    reference = None
+    for backend in backends:
+        rss_before = _process_rss_bytes()
+        start = time.perf_counter()
+        registry.get_pipeline(model, backend=backend, artifacts_dir=artifacts_dir)
+        load_s = time.perf_counter() - start
+        # Rules off so every message is decided by the backend under test
+        classifier = IntentClassifier(model, registry=registry, use_rules=False, category_cache=CategoryCache(),
+                                      load_financial_context=False, backend=backend, artifacts_dir=artifacts_dir)
+
+        labels = [classifier.classify_intent(message) for message in EVAL_MESSAGES]
+        labels = [(intent, info.get("category")) for intent, _, info in labels]
+        if reference is None:
+            reference = labels
+
+        latencies = []
+        for _ in range(repeat):
+            for message in EVAL_MESSAGES:
+                classifier.category_cache.clear()
+                start = time.perf_counter()
+                classifier.classify_intent(message)
+                latencies.append(time.perf_counter() - start)
+        latencies.sort()
+
+        report[backend] = {
+            "load_s": load_s,
+            "label_agreement_with_fp32": sum(a == b for a, b in zip(labels, reference)) / len(reference),
+            "disagreements": [
+                {"message": message, "fp32": ref, backend: got}
+                for message, ref, got in zip(EVAL_MESSAGES, reference, labels) if ref != got
+            ],
+            "mean_ms": statistics.mean(latencies) * 1000,
+            "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+            "rss_delta_mb": (_process_rss_bytes() - rss_before) / 2**20
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and compare zero-shot inference backends")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subcommands.add_parser("export", help="Write int8, ONNX or safetensors snapshot artifacts")
+    export_parser.add_argument("--backend", choices=["int8", "onnx", "mmap"], required=True)
+    export_parser.add_argument("--model", default=DEFAULT_MODEL)
+    export_parser.add_argument("--artifacts-dir", default=DEFAULT_ARTIFACTS_DIR)
+
+    compare_parser = subcommands.add_parser("compare", help="Check labels, latency and memory against fp32")
+    compare_parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    compare_parser.add_argument("--model", default=DEFAULT_MODEL)
+    compare_parser.add_argument("--artifacts-dir", default=DEFAULT_ARTIFACTS_DIR)
+    compare_parser.add_argument("--repeat", type=int, default=3)
+
+    args = parser.parse_args()
+    if args.command == "export":
+        print(f"Wrote {args.backend} artifacts to {export(args.model, args.backend, args.artifacts_dir)}")
+    else:
+        backends = ["torch"] + [b for b in args.backends if b != "torch"]
+        print(json.dumps(compare(args.model, backends, args.artifacts_dir, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import asyncio
+import atexit
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Mapping, Tuple
+
+
+class InferenceQueueFull(RuntimeError):
+    pass
+
+
+def _pin_torch_threads(threads: int) -> bool:
+    # Only once the classifier has loaded torch: importing it here would fail
+    # without torch, and throttle a process whose pipeline never uses it
+    torch = sys.modules.get("torch")
+    if not threads or torch is None:
+        return False
+    torch.set_num_threads(threads)
+    return True
+
+
+_worker_classifier = None
+
+
+def _init_process_worker(torch_threads: int, classifier_kwargs: Dict):
+    global _worker_classifier
+    from intent_classifier import IntentClassifier
+    _worker_classifier = IntentClassifier(**classifier_kwargs)
+    _pin_torch_threads(torch_threads)
+
+
+def _process_classify(text: str, corrections: Mapping[str, str] = None) -> Tuple[str, float, Dict]:
+    return _worker_classifier.classify_intent(text, corrections)
+
+
+class InferenceExecutor:
+    """Bounded pool for intent classification, so sessions don't oversubscribe the CPU.
+
+    mode="thread" shares one IntentClassifier between workers, unless a
+    call passes its own (see get_inference_executor()); torch's
+    intra-op pool is process-wide, so once the classifier has loaded torch
+    it is sized cores // workers.
+    mode="process" gives every worker its own classifier with its own
+    pinned thread count. At most `max_pending` requests may be queued or
+    running; beyond that classify() waits up to `timeout` and then raises
+    InferenceQueueFull.
+    """
+
+    def __init__(self, classifier=None, mode: str = "thread", max_workers: int = 2, torch_threads: int = None,
+                 max_pending: int = 32, timeout: float = None, classifier_kwargs: Dict = None):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown executor mode '{mode}'. Use 'thread' or 'process'.")
+        self.mode = mode
+        self.max_workers = max_workers
+        self.torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // max_workers)
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._stats_lock = threading.Lock()
+        self._latencies = deque(maxlen=10000)
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+        if mode == "thread":
+            # Built on the first call that doesn't bring its own classifier
+            self.classifier = classifier
+            self._classifier_kwargs = classifier_kwargs or {}
+            self._classifier_lock = threading.Lock()
+            # Retried on submit while unpinned, for classifiers that load the model lazily
+            self._torch_pinned = _pin_torch_threads(self.torch_threads)
+            self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+        else:
+            self.classifier = None
+            self._torch_pinned = False
+            self._pool = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_process_worker,
+                                             initargs=(self.torch_threads, classifier_kwargs or {}))
+
+    def _default_classifier(self):
+        if self.classifier is None:
+            with self._classifier_lock:
+                if self.classifier is None:
+                    from intent_classifier import IntentClassifier
+                    self.classifier = IntentClassifier(**self._classifier_kwargs)
+        return self.classifier
+
+    def classify(self, text: str, corrections: Mapping[str, str] = None, classifier=None) -> Future:
+        """classifier overrides the shared one in thread mode; process workers always use their own."""
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._stats_lock:
+                self.rejected += 1
+            raise InferenceQueueFull(f"{self.max_pending} classification requests already pending")
+        return self._submit(text, corrections, classifier)
+
+    async def classify_async(self, text: str, corrections: Mapping[str, str] = None,
+                             classifier=None) -> Tuple[str, float, Dict]:
+        if self._slots.acquire(blocking=False):
+            future = self._submit(text, corrections, classifier)
+        else:
+            # Waiting for a free slot would stall the event loop, so do it off-loop
+            loop = asyncio.get_running_loop()
+            future = await loop.run_in_executor(None, self.classify, text, corrections, classifier)
+        return await asyncio.wrap_future(future)
+
+    def _submit(self, text: str, corrections: Mapping[str, str] = None, classifier=None) -> Future:
+        with self._stats_lock:
+            self.pending += 1
+        submitted = time.perf_counter()
+        try:
+            if self.mode == "thread":
+                classifier = classifier or self._default_classifier()
+                if not self._torch_pinned:
+                    self._torch_pinned = _pin_torch_threads(self.torch_threads)
+                future = self._pool.submit(classifier.classify_intent, text, corrections)
+            else:
+                future = self._pool.submit(_process_classify, text, dict(corrections or {}))
+        except Exception:
+            self._release(None)
+            raise
+
+        future.add_done_callback(lambda _: self._release(time.perf_counter() - submitted))
+        return future
+
+    def _release(self, latency: float):
+        with self._stats_lock:
+            self.pending -= 1
+            if latency is not None:
+                self.completed += 1
+                self._latencies.append(latency)
+        self._slots.release()
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                "mode": self.mode,
+                "workers": self.max_workers,
+                "torch_threads": self.torch_threads,
+                "pending": self.pending,
+                "completed": self.completed,
+                "rejected": self.rejected
+            }
+        if latencies:
+            stats["p50_ms"] = latencies[int(0.50 * (len(latencies) - 1))] * 1000
+            stats["p95_ms"] = latencies[int(0.95 * (len(latencies) - 1))] * 1000
+            stats["max_ms"] = latencies[-1] * 1000
+        return stats
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_inference_executor() -> InferenceExecutor:
+    """The process-wide executor that sessions share unless given their own."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = InferenceExecutor()
+                atexit.register(shutdown_inference_executor)
+    return _executor
+
+
+def shutdown_inference_executor(wait: bool = True):
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
@@ -0,0 +1,271 @@
+import argparse
+import http.client
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import urlparse
+from metrics import Histogram
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128]
+QUEUE_WAIT_MS_BUCKETS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000]
+# Listen backlog; socketserver's default of 5 refuses bursts of concurrent sessions
+LISTEN_BACKLOG = 128
+
+
+class MicroBatcher:
+    """Coalesces single classify requests from many callers into padded batches.
+
+    A batch closes when it reaches max_batch_size or when max_wait_ms has
+    passed since its first request arrived. Requests in a batch that share
+    the same candidate labels go through the pipeline in one call.
+    """
+
+    def __init__(self, pipeline, max_batch_size: int = 16, max_wait_ms: float = 5.0):
+        self.pipeline = pipeline
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: "queue.Queue" = queue.Queue()
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_MS_BUCKETS)
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, sequence: str, candidate_labels: List[str]) -> Future:
+        future = Future()
+        self._queue.put((sequence, tuple(candidate_labels), future, time.perf_counter()))
+        return future
+
+    def classify(self, sequences: List[str], candidate_labels: List[str]) -> List[Dict]:
+        futures = [self.submit(sequence, candidate_labels) for sequence in sequences]
+        return [future.result() for future in futures]
+
+    def _collect(self) -> List:
+        batch = [self._queue.get()]
+        deadline = batch[0][3] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                # Past the deadline, still take whatever piled up meanwhile
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            self.batch_sizes.observe(len(batch))
+            for _, _, _, enqueued in batch:
+                self.queue_wait_ms.observe((started - enqueued) * 1000)
+
+            groups: Dict[tuple, List] = {}
+            for request in batch:
+                groups.setdefault(request[1], []).append(request)
+
+            for labels, requests in groups.items():
+                try:
+                    results = self.pipeline([request[0] for request in requests], list(labels),
+                                            batch_size=len(requests))
+                    if isinstance(results, dict):
+                        results = [results]
+                    for request, result in zip(requests, results):
+                        request[2].set_result(result)
+                except Exception as e:
+                    for request in requests:
+                        request[2].set_exception(e)
+
+    def stats(self) -> Dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queued": self._queue.qsize(),
+            "batch_size": self.batch_sizes.to_dict(),
+            "queue_wait_ms": self.queue_wait_ms.to_dict()
+        }
+
+
+class InferenceRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep client connections alive between requests
+    batcher: MicroBatcher = None
+
+    def _send_json(self, status: int, payload: Dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path != "/classify":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            sequences = request["sequences"]
+            labels = request["candidate_labels"]
+        except (ValueError, KeyError) as e:
+            self._send_json(400, {"error": f"Bad request: {e}"})
+            return
+        try:
+            self._send_json(200, {"results": self.batcher.classify(sequences, labels)})
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._send_json(200, self.batcher.stats())
+        elif self.path == "/metrics/prometheus":
+            lines = ["# TYPE inference_batch_size histogram"]
+            lines += self.batcher.batch_sizes.prometheus_lines("inference_batch_size", {})
+            lines += ["# TYPE inference_queue_wait_ms histogram"]
+            lines += self.batcher.queue_wait_ms.prometheus_lines("inference_queue_wait_ms", {})
+            body = ("\n".join(lines) + "\n").encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TCPHTTPServer(ThreadingHTTPServer):
+    request_queue_size = LISTEN_BACKLOG
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = LISTEN_BACKLOG
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler expects a (host, port) client address
+        return request, ("local", 0)
+
+
+def make_server(batcher: MicroBatcher, host: str = "127.0.0.1", port: int = 8765, unix_socket: str = None):
+    handler = type("BoundInferenceRequestHandler", (InferenceRequestHandler,), {"batcher": batcher})
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        return UnixHTTPServer(unix_socket, handler)
+    return TCPHTTPServer((host, port), handler)
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float = None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # Connect while blocking: with a timeout set the socket is non-blocking,
+        # and a full backlog fails at once with EAGAIN instead of waiting
+        self.sock.connect(self.socket_path)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+
+
+class RemoteZeroShotPipeline:
+    """Pipeline-compatible client for a local inference server.
+
+    url is "http://127.0.0.1:8765" or "unix:///path/to/socket".
+    """
+
+    def __init__(self, url: str, timeout: float = 30.0):
+        self.url = url
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            parsed = urlparse(self.url)
+            if parsed.scheme == "unix":
+                connection = UnixHTTPConnection(parsed.path, timeout=self.timeout)
+            else:
+                connection = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=self.timeout)
+            self._local.connection = connection
+        return connection
+
+    def _request(self, method: str, path: str, payload: Dict = None) -> Dict:
+        body = None if payload is None else json.dumps(payload)
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request(method, path, body=body, headers={"Content-Type": "application/json"})
+                response = connection.getresponse()
+                data = json.loads(response.read())
+                break
+            except (ConnectionError, http.client.HTTPException):
+                # Kept-alive connection went stale; reconnect once
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise
+        if response.status != 200:
+            raise RuntimeError(f"Inference server error {response.status}: {data.get('error')}")
+        return data
+
+    def __call__(self, sequences, candidate_labels: List[str], batch_size: int = None, **kwargs):
+        single = isinstance(sequences, str)
+        data = self._request("POST", "/classify", {
+            "sequences": [sequences] if single else list(sequences),
+            "candidate_labels": list(candidate_labels)
+        })
+        return data["results"][0] if single else data["results"]
+
+    def metrics(self) -> Dict:
+        return self._request("GET", "/metrics")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local micro-batching zero-shot inference server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix-socket", default=None)
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--backend", default="torch", choices=["torch", "int8", "onnx", "mmap"])
+    parser.add_argument("--max-batch-size", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--stub", action="store_true", help="Serve the deterministic stub model (no weights needed)")
+    args = parser.parse_args()
+
+    if args.stub:
+        from stub_pipeline import StubZeroShotPipeline
+        pipeline = StubZeroShotPipeline()
+    else:
+        from model_registry import DEFAULT_MODEL, get_registry
+        pipeline = get_registry().get_pipeline(args.model or DEFAULT_MODEL, backend=args.backend)
+
+    batcher = MicroBatcher(pipeline, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    server = make_server(batcher, args.host, args.port, args.unix_socket)
+    where = args.unix_socket or f"http://{args.host}:{args.port}"
+    print(f"Inference server listening on {where}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,112 @@
-from transformers import pipeline
 import re
-import json
-from typing import Dict, List, Tuple
-import pandas as pd
-from datasets import load_dataset
+import threading
+from typing import Dict, List, Mapping, Tuple
+from category_cache import CategoryCache, get_category_cache
+from financial_context import FinancialContext
+from inference_server import RemoteZeroShotPipeline
+from inference_backends import DEFAULT_ARTIFACTS_DIR, DEFAULT_BACKEND
+from metrics import span
+from model_cascade import CascadeStage, ZeroShotCascade
+from model_registry import DEFAULT_MODEL, ModelRegistry, get_registry
+
+HYPOTHESIS_TEMPLATE = "This example is {}."
+
+EXPENSE_CATEGORIES = [
+    "food_dining",
+    "transportation",
+    "shopping",
+    "entertainment",
+    "utilities_bills",
+    "healthcare",
+    "education",
+    "travel",
+    "other"
+]
+
+# Rule tier: each pattern only fires on phrasings whose intent is unambiguous.
+# Anything else falls through to the zero-shot model.
+INTENT_RULES = [
+    ("greeting", re.compile(r'^\s*(?:hi|hello|hey|hiya|howdy|good\s+(?:morning|afternoon|evening))(?:\s+there)?[\s!.,]*$', re.IGNORECASE)),
+    ("help", re.compile(r'^\s*(?:help|help me|what can you do|commands|menu)[\s!?.]*$', re.IGNORECASE)),
+    ("set_budget", re.compile(r'^\s*(?:please\s+)?(?:set|update|change)\b.*\bbudget\b.*\d', re.IGNORECASE)),
+    ("view_budget", re.compile(r'^\s*(?:show|view|see|check)\s+(?:me\s+)?(?:my\s+)?budget\b|\bhow\'?s\s+my\s+budget\b', re.IGNORECASE)),
+    ("get_advice", re.compile(r'\b(?:give|get|need|want)\b.*\badvice\b', re.IGNORECASE)),
+    ("analyze_trends", re.compile(r'\b(?:spending\s+trends?|biggest\s+expense|top\s+category)\b', re.IGNORECASE)),
+    ("analyze_trends", re.compile(r'\b(?:how\s+has|changed?|trend(?:ed|ing)?|compared?)\b.*\b(?:months|year|quarter)\b|'
+                                  r'\byear[\s-]+over[\s-]+year\b', re.IGNORECASE)),
+]
+
+# Period and category of a multi-month trend question ("how has food
+# spending changed over the last 6 months?")
+NUMBER_WORDS = {"two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "nine": 9, "twelve": 12, "eighteen": 18}
+TREND_MONTHS_PATTERN = re.compile(r'\b(?:last|past|previous|over\s+the(?:\s+last|\s+past)?)\s+(\d+|'
+                                  + '|'.join(NUMBER_WORDS) + r')\s+months\b', re.IGNORECASE)
+TREND_YEAR_PATTERN = re.compile(r'\b(?:(?:last|past|this|over\s+the(?:\s+last|\s+past)?)\s+year|'
+                                r'year[\s-]+over[\s-]+year|12\s+months)\b', re.IGNORECASE)
+TREND_QUARTER_PATTERN = re.compile(r'\b(?:last|past|this|over\s+the(?:\s+last|\s+past)?)\s+quarter\b', re.IGNORECASE)
+
+# Only reports of money already spent ("I paid $40", "add $5 for coffee");
+# questions, plans and hypotheticals ("should I buy a $1200 laptop?") go to the model
+EXPENSE_VERB_PATTERN = re.compile(r'\b(?:spent|paid|bought|purchased)\b|^\s*(?:please\s+)?add(?:ed)?\b', re.IGNORECASE)
+EXPENSE_ABSTAIN_PATTERN = re.compile(r'\?|\b(?:should|shall|can|could|would|might|may|if|want|wants|afford)\b',
+                                     re.IGNORECASE)
+BUDGET_WORD_PATTERN = re.compile(r'\bbudget\b', re.IGNORECASE)
+
+CATEGORY_KEYWORDS = {
+    "food_dining": ["pizza", "coffee", "lunch", "dinner", "breakfast", "brunch", "groceries", "grocery",
+                    "restaurant", "burger", "sushi", "snacks?", "cafe", "takeout", "tacos?"],
+    "transportation": ["uber", "lyft", "taxi", "cab", "gas", "fuel", "bus", "train", "subway", "metro", "parking"],
+    "shopping": ["clothes", "shoes", "shirts?", "jacket", "jeans", "amazon", "mall"],
+    "entertainment": ["movies?", "cinema", "netflix", "spotify", "concert", "video games?"],
+    "utilities_bills": ["rent", "electricity", "electric bill", "water bill", "internet", "phone bill", "utilities"],
+    "healthcare": ["doctor", "dentist", "pharmacy", "medicine", "prescription", "hospital"],
+    "education": ["tuition", "textbooks?", "course", "school supplies"],
+    "travel": ["flights?", "hotel", "airbnb", "airfare", "vacation"],
+}
+
+CATEGORY_PATTERNS = {
+    category: re.compile(r'\b(?:' + '|'.join(words) + r')\b', re.IGNORECASE)
+    for category, words in CATEGORY_KEYWORDS.items()
+}
+
+# Category names as people say them ("food spending", "utilities")
+CATEGORY_NAME_PATTERNS = {
+    category: re.compile(r'\b(?:' + '|'.join(words) + r')\b', re.IGNORECASE)
+    for category, words in {
+        "food_dining": ["food", "dining", "eating out", "restaurants?", "groceries"],
+        "transportation": ["transportation", "transport", "commuting", "car"],
+        "shopping": ["shopping"],
+        "entertainment": ["entertainment", "fun"],
+        "utilities_bills": ["utilities", "bills"],
+        "healthcare": ["healthcare", "health", "medical"],
+        "education": ["education", "school"],
+        "travel": ["travel", "trips?", "vacations?"],
+    }.items()
+}
 
 class IntentClassifier:
-    def __init__(self):
-        self.classifier = pipeline("zero-shot-classification", 
-                                 model="facebook/bart-large-mnli")
+    def __init__(self, model_name: str = DEFAULT_MODEL, registry: ModelRegistry = None,
+                 use_rules: bool = True, speculative_category: bool = False, batch_size: int = 8,
+                 category_cache: CategoryCache = None, load_financial_context: bool = True,
+                 server_url: str = None, pipeline=None, backend: str = DEFAULT_BACKEND,
+                 artifacts_dir: str = DEFAULT_ARTIFACTS_DIR, cascade: List[CascadeStage] = None,
+                 audit_rate: float = 0.0, lazy_model: bool = False):
+        self.model_name = model_name
+        self.backend = backend
+        self.artifacts_dir = artifacts_dir
+        self.registry = registry or get_registry()
+        self._cascade = cascade
+        self._audit_rate = audit_rate
+        self._server_url = server_url
+        self._pipeline = pipeline
+        self._pipeline_lock = threading.Lock()
+        if not lazy_model:
+            self.classifier
+        self.use_rules = use_rules
+        self.speculative_category = speculative_category
+        self.batch_size = batch_size
+        self.category_cache = category_cache or get_category_cache()
+        self.stats = {"rule_hits": 0, "rule_misses": 0, "model_calls": 0}
         
         self.intents = [
             "add_expense",
@@ -21,33 +119,61 @@ class IntentClassifier:
             "help"
         ]
         
-        self.financial_context = self._load_financial_context()
+        self.load_financial_context = load_financial_context
+        self._financial_context = None
     
-    def _load_financial_context(self) -> Dict:
-        try:
-            dataset = load_dataset("takala/financial_phrasebank", split="train")
-            
-            context = {
-                "positive": [],
-                "negative": [], 
-                "neutral": []
-            }
-            
-            for item in dataset:
-                sentence = item['sentence']
-                label = item['label']
-                
-                if label == 0:  
-                    context["negative"].append(sentence)
-                elif label == 1:  
-                    context["neutral"].append(sentence) 
-                elif label == 2:  
-                    context["positive"].append(sentence)
-                    
-            return context
-        except Exception as e:
-            print(f"Warning: Could not load financial dataset: {e}")
-            return {"positive": [], "negative": [], "neutral": []}
+    @property
+    def classifier(self):
+        # With lazy_model=True the pipeline loads on first use, so rule hits
+        # can be answered while it is still loading.
+        if self._pipeline is None:
+            with self._pipeline_lock:
+                if self._pipeline is None:
+                    self._pipeline = self._load_pipeline()
+        return self._pipeline
+    
+    @classifier.setter
+    def classifier(self, pipeline):
+        self._pipeline = pipeline
+    
+    @property
+    def model_ready(self) -> bool:
+        return self._pipeline is not None
+    
+    def _load_pipeline(self):
+        if self._server_url is not None:
+            # Classification happens in a shared local inference server
+            return RemoteZeroShotPipeline(self._server_url)
+        if self._cascade:
+            for stage in self._cascade:
+                if stage.pipeline is None:
+                    stage.pipeline = self.registry.get_pipeline(stage.model, owner=self, backend=stage.backend,
+                                                                artifacts_dir=self.artifacts_dir)
+            return ZeroShotCascade(self._cascade, audit_rate=self._audit_rate)
+        return self.registry.get_pipeline(self.model_name, owner=self, backend=self.backend,
+                                          artifacts_dir=self.artifacts_dir)
+    
+    def load_in_background(self) -> threading.Thread:
+        def load():
+            try:
+                self.classifier
+            except Exception as e:
+                # The next foreground call retries and raises properly
+                print(f"Warning: background model load failed: {e}")
+        
+        thread = threading.Thread(target=load, name="model-loader", daemon=True)
+        thread.start()
+        return thread
+    
+    @property
+    def financial_context(self):
+        # Loaded on first access only; the phrasebank is not needed to classify
+        if self._financial_context is None:
+            if self.load_financial_context:
+                self._financial_context = FinancialContext()
+            else:
+                self._financial_context = {"positive": [], "negative": [], "neutral": []}
+        return self._financial_context
     
     def extract_expense_info(self, text: str) -> Dict:
         amount_patterns = [
@@ -74,37 +200,227 @@ class IntentClassifier:
             "description": description
         }
     
-    def categorize_expense(self, description: str) -> str:
-        categories = [
-            "food_dining",
-            "transportation", 
-            "shopping",
-            "entertainment",
-            "utilities_bills",
-            "healthcare",
-            "education",
-            "travel",
-            "other"
-        ]
+    def categorize_expense(self, description: str, corrections: Mapping[str, str] = None) -> str:
+        category = _corrected(description, corrections) or self._rule_category(description)
+        if category is not None:
+            return category
+        category = self.category_cache.get(description)
+        if category is None:
+            self.stats["model_calls"] += 1
+            result = self.classifier(description, EXPENSE_CATEGORIES)
+            category = result['labels'][0]
+            self.category_cache.put(description, category)
+        return category
+    
+    def categorize_batch(self, descriptions: List[str], batch_size: int = None,
+                         corrections: Mapping[str, str] = None) -> List[str]:
+        by_description = {}
+        misses = []
+        for description in dict.fromkeys(descriptions):
+            # Same tiers as the chat path: corrections, keyword rules, cache, model
+            category = _corrected(description, corrections) or self._rule_category(description)
+            if category is None:
+                category = self.category_cache.get(description)
+            if category is None:
+                misses.append(description)
+            else:
+                by_description[description] = category
         
-        result = self.classifier(description, categories)
-        return result['labels'][0]
+        if misses:
+            self.stats["model_calls"] += len(misses)
+            results = _as_list(self.classifier(misses, EXPENSE_CATEGORIES, batch_size=batch_size or self.batch_size))
+            for description, result in zip(misses, results):
+                by_description[description] = result['labels'][0]
+                self.category_cache.put(description, result['labels'][0])
+        
+        return [by_description[description] for description in descriptions]
+    
+    def extract_trend_period(self, text: str):
+        match = TREND_MONTHS_PATTERN.search(text)
+        if match:
+            count = match.group(1).lower()
+            return int(count) if count.isdigit() else NUMBER_WORDS[count]
+        if TREND_YEAR_PATTERN.search(text):
+            return 12
+        if TREND_QUARTER_PATTERN.search(text):
+            return 3
+        if re.search(r'\b(?:changed?|over\s+time|month[\s-]+over[\s-]+month)\b', text, re.IGNORECASE):
+            return 6
+        return None
+    
+    def match_category_rule(self, description: str):
+        matches = [category for category, pattern in CATEGORY_PATTERNS.items() if pattern.search(description)]
+        # Mixed signals ("coffee at the cinema") are left to the model
+        return matches[0] if len(matches) == 1 else None
     
-    def classify_intent(self, text: str) -> Tuple[str, float, Dict]:
-        result = self.classifier(text, self.intents)
-        intent = result['labels'][0]
-        confidence = result['scores'][0]
+    def match_intent_rule(self, text: str):
+        for intent, pattern in INTENT_RULES:
+            if pattern.search(text):
+                return intent
         
-        extracted_info = {}
+        if (EXPENSE_VERB_PATTERN.search(text) and not BUDGET_WORD_PATTERN.search(text)
+                and not EXPENSE_ABSTAIN_PATTERN.search(text)):
+            info = self.extract_expense_info(text)
+            if info["amount"] is not None and info["description"]:
+                return "add_expense"
         
-        if intent == "add_expense":
-            extracted_info = self.extract_expense_info(text)
-            if extracted_info["description"]:
-                extracted_info["category"] = self.categorize_expense(extracted_info["description"])
+        return None
+    
+    def classify_intent(self, text: str, corrections: Mapping[str, str] = None) -> Tuple[str, float, Dict]:
+        """corrections: the user's own description -> category choices (BudgetAdvisor.category_corrections)."""
+        with span("intent_rules"):
+            intent = self.match_intent_rule(text) if self.use_rules else None
+        category = None
         
-        elif intent == "set_budget":
-            amount_match = re.search(r'\$?(\d+(?:\.\d{2})?)', text)
-            if amount_match:
-                extracted_info["budget_amount"] = float(amount_match.group(1))
+        if intent is not None:
+            self.stats["rule_hits"] += 1
+            confidence = 1.0
+        else:
+            if self.use_rules:
+                self.stats["rule_misses"] += 1
+            self.stats["model_calls"] += 1
+            with span("intent_model"):
+                if self.speculative_category and self.supports_combined_inference():
+                    result, category = self._classify_combined(text, corrections)
+                else:
+                    result = self.classifier(text, self.intents)
+            intent = result['labels'][0]
+            confidence = result['scores'][0]
         
-        return intent, confidence, extracted_info
+        return intent, confidence, self._extract_for_intent(intent, text, category, corrections=corrections)
+    
+    def classify_batch(self, texts: List[str], batch_size: int = None,
+                       corrections: Mapping[str, str] = None) -> List[Tuple[str, float, Dict]]:
+        batch_size = batch_size or self.batch_size
+        intents = [self.match_intent_rule(text) if self.use_rules else None for text in texts]
+        confidences = [1.0] * len(texts)
+        
+        pending = [i for i, intent in enumerate(intents) if intent is None]
+        self.stats["rule_hits"] += len(texts) - len(pending)
+        if self.use_rules:
+            self.stats["rule_misses"] += len(pending)
+        
+        if pending:
+            self.stats["model_calls"] += len(pending)
+            results = _as_list(self.classifier([texts[i] for i in pending], self.intents, batch_size=batch_size))
+            for i, result in zip(pending, results):
+                intents[i] = result['labels'][0]
+                confidences[i] = result['scores'][0]
+        
+        # Extract fields without the model first, then categorize every
+        # description the rules could not place in one batched call.
+        extracted = [self._extract_for_intent(intent, text, categorize=False, corrections=corrections)
+                     for intent, text in zip(intents, texts)]
+        uncategorized = [info for info in extracted if info.get("description") and "category" not in info]
+        if uncategorized:
+            categories = self.categorize_batch([info["description"] for info in uncategorized], batch_size)
+            for info, category in zip(uncategorized, categories):
+                info["category"] = category
+        
+        return list(zip(intents, confidences, extracted))
+    
+    def _classify_combined(self, text: str, corrections: Mapping[str, str] = None) -> Tuple[Dict, str]:
+        # Guess the category in the same forward pass as the intent. Only
+        # worth it when the text already carries an amount and a description,
+        # since add_expense needs both anyway.
+        groups = [(text, self.intents)]
+        info = self.extract_expense_info(text)
+        description = info["description"]
+        category = None
+        if (info["amount"] is not None and description and _corrected(description, corrections) is None
+                and not self._rule_category(description)):
+            category = self.category_cache.get(description)
+            if category is None:
+                groups.append((description, EXPENSE_CATEGORIES))
+        
+        results = self.zero_shot_batch(groups)
+        if len(results) > 1:
+            category = results[1]['labels'][0]
+            self.category_cache.put(description, category)
+        return results[0], category
+    
+    def supports_combined_inference(self) -> bool:
+        return all(hasattr(self.classifier, attr) for attr in ("model", "tokenizer", "entailment_id"))
+    
+    def zero_shot_batch(self, groups: List[Tuple[str, List[str]]]) -> List[Dict]:
+        # Same scoring as the zero-shot pipeline (single-label softmax over the
+        # entailment logits), but every premise/hypothesis pair of every group
+        # goes through the model as one padded batch.
+        premises, hypotheses = [], []
+        for sequence, labels in groups:
+            for label in labels:
+                premises.append(sequence)
+                hypotheses.append(HYPOTHESIS_TEMPLATE.format(label))
+        
+        tokenizer = self.classifier.tokenizer
+        inputs = tokenizer(premises, hypotheses, return_tensors="pt", padding=True, truncation="only_first")
+        inputs = {name: tensor.to(self.classifier.device) for name, tensor in inputs.items()}
+        import torch
+        with torch.no_grad():
+            logits = self.classifier.model(**inputs).logits
+        entailment = logits[:, self.classifier.entailment_id].float().cpu()
+        
+        results = []
+        offset = 0
+        for sequence, labels in groups:
+            scores = entailment[offset:offset + len(labels)].softmax(dim=-1).tolist()
+            offset += len(labels)
+            order = sorted(range(len(labels)), key=lambda i: scores[i], reverse=True)
+            results.append({
+                "sequence": sequence,
+                "labels": [labels[i] for i in order],
+                "scores": [scores[i] for i in order]
+            })
+        return results
+    
+    def _rule_category(self, description: str):
+        return self.match_category_rule(description) if self.use_rules else None
+    
+    def _extract_for_intent(self, intent: str, text: str, category: str = None,
+                            categorize: bool = True, corrections: Mapping[str, str] = None) -> Dict:
+        with span("extract"):
+            extracted_info = {}
+            
+            if intent == "add_expense":
+                extracted_info = self.extract_expense_info(text)
+                if extracted_info["description"]:
+                    description = extracted_info["description"]
+                    # The user's own correction wins over the keyword rules
+                    category = (_corrected(description, corrections) or self._rule_category(description)
+                                or category)
+                    if category is None and categorize:
+                        with span("categorize"):
+                            category = self.categorize_expense(extracted_info["description"])
+                    if category is not None:
+                        extracted_info["category"] = category
+            
+            elif intent == "analyze_trends":
+                months = self.extract_trend_period(text)
+                if months:
+                    extracted_info["months"] = months
+                    matches = [c for c, pattern in CATEGORY_NAME_PATTERNS.items() if pattern.search(text)]
+                    if len(matches) == 1:
+                        extracted_info["category"] = matches[0]
+            
+            elif intent == "set_budget":
+                amount_match = re.search(r'\$?(\d+(?:\.\d{2})?)', text)
+                if amount_match:
+                    extracted_info["budget_amount"] = float(amount_match.group(1))
+            
+            return extracted_info
+    
+    def cascade_stats(self) -> List[Dict]:
+        return self._pipeline.stats() if isinstance(self._pipeline, ZeroShotCascade) else []
+    
+    def rule_hit_rate(self) -> float:
+        decided = self.stats["rule_hits"] + self.stats["rule_misses"]
+        return self.stats["rule_hits"] / decided if decided else 0.0
+
+
+def _corrected(description: str, corrections: Mapping[str, str] = None):
+    return corrections.get(CategoryCache.normalize(description)) if corrections else None
+
+
+def _as_list(result) -> List[Dict]:
+    # The pipeline unwraps single-sequence inputs into a bare dict
+    return [result] if isinstance(result, dict) else list(result)
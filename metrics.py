@@ -0,0 +1,229 @@
+import cProfile
+import io
+import os
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+
+LATENCY_MS_BUCKETS = [0.1, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+
+class Histogram:
+    def __init__(self, bounds: List[float]):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.counts[bisect_left(self.bounds, value)] += 1
+            self.count += 1
+            self.sum += value
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            buckets = {str(bound): count for bound, count in zip(self.bounds, self.counts)}
+            buckets["+Inf"] = self.counts[-1]
+            return {"count": self.count, "sum": self.sum, "buckets": buckets}
+
+    def prometheus_lines(self, name: str, labels: Dict[str, str]) -> List[str]:
+        with self._lock:
+            counts, count, total = list(self.counts), self.count, self.sum
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.bounds + ["+Inf"], counts):
+            cumulative += bucket_count
+            lines.append(f"{name}_bucket{_labels({**labels, 'le': str(bound)})} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels)} {total}")
+        lines.append(f"{name}_count{_labels(labels)} {count}")
+        return lines
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+
+class Trace:
+    """Timings for one request. Stage times are exclusive: a span's time
+    does not include the spans nested inside it, so stages add up to the
+    request total."""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.intent = None
+        self._stack: List[list] = []
+
+    def enter(self, stage: str):
+        self._stack.append([stage, time.perf_counter(), 0.0])
+
+    def exit(self):
+        stage, start, nested = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        self.stages[stage] = self.stages.get(stage, 0.0) + (elapsed - nested) * 1000
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+
+_local = threading.local()
+
+
+@contextmanager
+def span(stage: str):
+    """Time a stage of the request running on this thread; a no-op outside one."""
+    trace = getattr(_local, "trace", None)
+    if trace is None:
+        yield
+        return
+    trace.enter(stage)
+    try:
+        yield
+    finally:
+        trace.exit()
+
+
+class Metrics:
+    """Per-stage and per-intent chat latency, counters and collected gauges.
+
+    profile_rate is the fraction of requests run under cProfile and
+    tracemalloc; their top functions and peak allocation are kept in
+    `profiles`, and written as .prof files when profile_dir is set.
+    """
+
+    def __init__(self, profile_rate: float = 0.0, profile_dir: str = None, max_profiles: int = 20):
+        self.profile_rate = profile_rate
+        self.profile_dir = profile_dir
+        self.profiles = deque(maxlen=max_profiles)
+        self._lock = threading.Lock()
+        self._profile_lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Tuple], Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._collectors: Dict[str, Tuple[str, str, Callable[[], float]]] = {}
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        key = (name, tuple(sorted(labels.items())))
+        hist = self._histograms.get(key)
+        if hist is None:
+            with self._lock:
+                hist = self._histograms.setdefault(key, Histogram(LATENCY_MS_BUCKETS))
+        return hist
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def register(self, name: str, read: Callable[[], float], kind: str = "gauge", help: str = ""):
+        # Values owned elsewhere (classifier stats, cache, ledger) are read at export time
+        with self._lock:
+            self._collectors[name] = (kind, help, read)
+
+    @contextmanager
+    def request(self, started: float = None):
+        trace = Trace()
+        previous = getattr(_local, "trace", None)
+        _local.trace = trace
+        profiler = self._start_profile()
+        start = started or time.perf_counter()
+        try:
+            yield trace
+        finally:
+            total = (time.perf_counter() - start) * 1000
+            _local.trace = previous
+            intent = trace.intent or "unknown"
+            if profiler is not None:
+                self._finish_profile(profiler, intent, total)
+            self.inc("chat_requests_total", intent=intent)
+            self.histogram("chat_request_latency_ms", intent=intent).observe(total)
+            for stage, elapsed in trace.stages.items():
+                self.histogram("chat_stage_latency_ms", stage=stage, intent=intent).observe(elapsed)
+
+    def _start_profile(self):
+        if not self.profile_rate or random.random() >= self.profile_rate:
+            return None
+        # cProfile and tracemalloc are process-wide: one sampled request at a time
+        if not self._profile_lock.acquire(blocking=False):
+            return None
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler, started_tracing
+
+    def _finish_profile(self, profile, intent: str, total_ms: float):
+        profiler, started_tracing = profile
+        try:
+            profiler.disable()
+            _, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(15)
+            record = {"intent": intent, "total_ms": total_ms, "peak_alloc_bytes": peak,
+                      "timestamp": time.time(), "top_functions": out.getvalue()}
+            if self.profile_dir:
+                os.makedirs(self.profile_dir, exist_ok=True)
+                record["path"] = os.path.join(self.profile_dir, f"{intent}-{time.time_ns()}.prof")
+                profiler.dump_stats(record["path"])
+            self.profiles.append(record)
+        finally:
+            self._profile_lock.release()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            histograms = list(self._histograms.items())
+            counters = dict(self._counters)
+            collectors = dict(self._collectors)
+        return {
+            "histograms": [{"name": name, "labels": dict(labels), **hist.to_dict()}
+                           for (name, labels), hist in histograms],
+            "counters": [{"name": name, "labels": dict(labels), "value": value}
+                         for (name, labels), value in counters.items()],
+            "collected": {name: _read(read) for name, (_, _, read) in collectors.items()},
+            "profiles": [{k: v for k, v in p.items() if k != "top_functions"} for p in self.profiles]
+        }
+
+    def to_prometheus(self) -> str:
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+            collectors = dict(self._collectors)
+
+        lines = []
+        typed = set()
+        for (name, labels), hist in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            lines.extend(hist.prometheus_lines(name, dict(labels)))
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{_labels(dict(labels))} {value}")
+        for name, (kind, help, read) in sorted(collectors.items()):
+            if help:
+                lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {_read(read)}")
+        return "\n".join(lines) + "\n"
+
+
+def _read(read: Callable[[], float]) -> float:
+    try:
+        return read()
+    except Exception as e:
+        print(f"Warning: metric collector failed: {e}")
+        return float("nan")
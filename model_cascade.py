@@ -0,0 +1,125 @@
+import random
+import threading
+from typing import Dict, List
+
+
+class CascadeStage:
+    """One model in a cascade. A result is accepted when its top score is at
+    least min_score and it leads the runner-up by at least min_margin;
+    otherwise the sequence moves on to the next stage."""
+
+    def __init__(self, model: str = None, min_score: float = 0.0, min_margin: float = 0.0,
+                 backend: str = "torch", pipeline=None):
+        self.model = model
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.backend = backend
+        self.pipeline = pipeline
+
+    def confident(self, result: Dict) -> bool:
+        scores = result["scores"]
+        margin = scores[0] - scores[1] if len(scores) > 1 else scores[0]
+        return scores[0] >= self.min_score and margin >= self.min_margin
+
+
+class ZeroShotCascade:
+    """Pipeline-compatible chain of zero-shot models, cheapest first.
+
+    The last stage always answers, whatever its thresholds. For every
+    stage the cascade counts calls, accepted and escalated sequences, and
+    how often an escalated sequence's top label matched the final answer.
+    With audit_rate > 0, that fraction of accepted sequences is also run
+    through the last stage, giving the agreement rate of the answers the
+    stage actually kept, which is what its thresholds should be tuned on.
+    """
+
+    def __init__(self, stages: List[CascadeStage], audit_rate: float = 0.0, seed: int = None):
+        if not stages:
+            raise ValueError("A cascade needs at least one stage")
+        for stage in stages:
+            if stage.pipeline is None:
+                raise ValueError(f"Cascade stage '{stage.model}' has no pipeline loaded")
+        self.stages = stages
+        self.audit_rate = audit_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counts = [
+            {"calls": 0, "sequences": 0, "accepted": 0, "escalated": 0,
+             "escalated_agreed": 0, "audited": 0, "audit_agreed": 0}
+            for _ in stages
+        ]
+
+    def __call__(self, sequences, candidate_labels: List[str], batch_size: int = None, **kwargs):
+        single = isinstance(sequences, str)
+        sequences = [sequences] if single else list(sequences)
+        results = [None] * len(sequences)
+        # index -> [(stage that escalated it, that stage's top label), ...]
+        escalated = {}
+        audits = []
+        pending = list(range(len(sequences)))
+        last = len(self.stages) - 1
+
+        for level, stage in enumerate(self.stages):
+            if not pending:
+                break
+            stage_results = _as_list(stage.pipeline([sequences[i] for i in pending], candidate_labels,
+                                                    batch_size=batch_size, **kwargs))
+            unsure = []
+            for i, result in zip(pending, stage_results):
+                if level == last or stage.confident(result):
+                    results[i] = result
+                    if level < last and self.audit_rate and self._random.random() < self.audit_rate:
+                        audits.append((i, level, result["labels"][0]))
+                else:
+                    unsure.append(i)
+                    escalated.setdefault(i, []).append((level, result["labels"][0]))
+            self._record(level, "calls", 1)
+            self._record(level, "sequences", len(pending))
+            self._record(level, "accepted", len(pending) - len(unsure))
+            self._record(level, "escalated", len(unsure))
+            pending = unsure
+
+        if audits:
+            audit_results = _as_list(self.stages[last].pipeline([sequences[i] for i, _, _ in audits],
+                                                                candidate_labels, batch_size=batch_size, **kwargs))
+            for (i, level, label), result in zip(audits, audit_results):
+                self._record(level, "audited", 1)
+                self._record(level, "audit_agreed", int(label == result["labels"][0]))
+
+        for i, guesses in escalated.items():
+            for level, label in guesses:
+                self._record(level, "escalated_agreed", int(label == results[i]["labels"][0]))
+
+        return results[0] if single else results
+
+    def _record(self, level: int, counter: str, amount: int):
+        with self._lock:
+            self._counts[level][counter] += amount
+
+    def stats(self) -> List[Dict]:
+        with self._lock:
+            counts = [dict(c) for c in self._counts]
+        report = []
+        for stage, c in zip(self.stages, counts):
+            report.append({
+                "model": stage.model,
+                "backend": stage.backend,
+                "min_score": stage.min_score,
+                "min_margin": stage.min_margin,
+                **c,
+                "accept_rate": c["accepted"] / c["sequences"] if c["sequences"] else 0.0,
+                "escalated_agreement": c["escalated_agreed"] / c["escalated"] if c["escalated"] else None,
+                "audit_agreement": c["audit_agreed"] / c["audited"] if c["audited"] else None
+            })
+        return report
+
+
+def _as_list(result) -> List[Dict]:
+    return [result] if isinstance(result, dict) else list(result)
+
+
+def parse_stage(spec: str) -> CascadeStage:
+    # "model[:min_score[:min_margin]]", e.g. "typeform/distilbert-base-uncased-mnli:0.6:0.2"
+    model, *thresholds = spec.split(":")
+    thresholds = [float(t) for t in thresholds] + [0.0] * (2 - len(thresholds))
+    return CascadeStage(model, min_score=thresholds[0], min_margin=thresholds[1])
@@ -0,0 +1,122 @@
+import os
+import threading
+import weakref
+from typing import Dict, Tuple
+from inference_backends import DEFAULT_ARTIFACTS_DIR, DEFAULT_BACKEND, DEFAULT_MODEL, DEFAULT_TASK, load_pipeline
+
+
+class ModelRegistry:
+    """Process-wide cache of loaded pipelines, shared by every chat session."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pipelines: Dict[Tuple[str, str, str], object] = {}
+        self._load_locks: Dict[Tuple[str, str, str], threading.Lock] = {}
+        self._sessions: Dict[Tuple[str, str, str], weakref.WeakSet] = {}
+
+    def get_pipeline(self, model: str = DEFAULT_MODEL, task: str = DEFAULT_TASK, owner=None,
+                     backend: str = DEFAULT_BACKEND, artifacts_dir: str = DEFAULT_ARTIFACTS_DIR):
+        key = (task, model, backend)
+        pipe = self._pipelines.get(key)
+        if pipe is None:
+            with self._lock:
+                load_lock = self._load_locks.setdefault(key, threading.Lock())
+            # One loader per model; concurrent sessions wait here instead of
+            # loading their own copy.
+            with load_lock:
+                pipe = self._pipelines.get(key)
+                if pipe is None:
+                    pipe = load_pipeline(model, backend, task, artifacts_dir)
+                    with self._lock:
+                        self._pipelines[key] = pipe
+        if owner is not None:
+            self.attach(owner, model, task, backend)
+        return pipe
+
+    def attach(self, owner, model: str = DEFAULT_MODEL, task: str = DEFAULT_TASK, backend: str = DEFAULT_BACKEND):
+        with self._lock:
+            self._sessions.setdefault((task, model, backend), weakref.WeakSet()).add(owner)
+
+    def detach(self, owner, model: str = DEFAULT_MODEL, task: str = DEFAULT_TASK, backend: str = DEFAULT_BACKEND):
+        with self._lock:
+            sessions = self._sessions.get((task, model, backend))
+            if sessions is not None:
+                sessions.discard(owner)
+
+    def session_count(self, model: str = DEFAULT_MODEL, task: str = DEFAULT_TASK,
+                      backend: str = DEFAULT_BACKEND) -> int:
+        with self._lock:
+            return len(self._sessions.get((task, model, backend), ()))
+
+    def unload(self, model: str = DEFAULT_MODEL, task: str = DEFAULT_TASK, backend: str = DEFAULT_BACKEND):
+        with self._lock:
+            self._pipelines.pop((task, model, backend), None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            items = list(self._pipelines.items())
+            sessions = {key: len(owners) for key, owners in self._sessions.items()}
+
+        models = {}
+        for (task, model, backend), pipe in items:
+            models[f"{model} ({backend})"] = {
+                "task": task,
+                "backend": backend,
+                "memory_bytes": _pipeline_bytes(pipe),
+                "sessions": sessions.get((task, model, backend), 0)
+            }
+
+        return {
+            "models": models,
+            "model_memory_bytes": sum(m["memory_bytes"] for m in models.values()),
+            "process_rss_bytes": _process_rss_bytes(),
+            "sessions": sum(sessions.values())
+        }
+
+
+def _pipeline_bytes(pipe) -> int:
+    model = getattr(pipe, "model", None)
+    if model is None or not hasattr(model, "parameters"):
+        return 0
+    total = sum(p.numel() * p.element_size() for p in model.parameters())
+    total += sum(b.numel() * b.element_size() for b in model.buffers())
+    return total
+
+
+def _process_rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        try:
+            import resource
+            # ru_maxrss is the peak, in KiB on Linux
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        except ImportError:
+            return 0
+
+
+def _process_pss_bytes() -> int:
+    # Proportional set size: shared pages count 1/N towards each of the N
+    # processes mapping them, so it shows what weight sharing actually saves.
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
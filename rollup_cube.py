@@ -0,0 +1,187 @@
+from functools import lru_cache
+from typing import Dict, List, Tuple
+import numpy as np
+
+
+def month_number(month: str) -> int:
+    # Months since 1970-01, the same integers numpy uses for datetime64[M]
+    year, mon = month.split("-")
+    return (int(year) - 1970) * 12 + int(mon) - 1
+
+
+def month_label(number: int) -> str:
+    return f"{1970 + number // 12:04d}-{number % 12 + 1:02d}"
+
+
+@lru_cache(maxsize=32)
+def _shared_columns(categories: Tuple[str, ...]) -> Dict[str, int]:
+    # One read-only index per vocabulary, shared by every cube that uses it
+    return {category: i for i, category in enumerate(categories)}
+
+
+class RollupCube:
+    """Dense month x category totals and counts, maintained as expenses change.
+
+    Rows are consecutive months from the earliest one seen, columns are
+    categories. Every update touches one cell, and trend queries slice a
+    window of rows, so neither depends on the number of transactions.
+    A cell whose count drops to zero is reset to exactly zero, so removals
+    leave no float residue.
+    """
+
+    def __init__(self, categories: List[str]):
+        # A tuple vocabulary is shared as-is; it is copied on the first new category
+        self.categories = categories if isinstance(categories, tuple) else list(categories)
+        self._columns = _shared_columns(tuple(categories))
+        self._first = None
+        self._totals = np.zeros((0, len(self.categories)), dtype=np.float64)
+        self._counts = np.zeros((0, len(self.categories)), dtype=np.int64)
+
+    def __len__(self) -> int:
+        return self._totals.shape[0]
+
+    def _column(self, category: str) -> int:
+        column = self._columns.get(category)
+        if column is None:
+            column = len(self.categories)
+            self._columns = {**self._columns, category: column}
+            self.categories = [*self.categories, category]
+            self._totals = np.hstack([self._totals, np.zeros((len(self), 1))])
+            self._counts = np.hstack([self._counts, np.zeros((len(self), 1), dtype=np.int64)])
+        return column
+
+    def _cover(self, low: int, high: int):
+        # Grow the row range to include months low..high; new months are rare
+        if self._first is None:
+            self._first = low
+        first = min(self._first, low)
+        last = max(self._first + len(self) - 1, high)
+        if first == self._first and last == self._first + len(self) - 1:
+            return
+        offset = self._first - first
+        totals = np.zeros((last - first + 1, len(self.categories)))
+        counts = np.zeros((last - first + 1, len(self.categories)), dtype=np.int64)
+        totals[offset:offset + len(self)] = self._totals
+        counts[offset:offset + len(self)] = self._counts
+        self._totals, self._counts, self._first = totals, counts, first
+
+    def add(self, month: str, category: str, amount: float, count: int = 1):
+        number = month_number(month)
+        column = self._column(category)
+        self._cover(number, number)
+        row = number - self._first
+        self._totals[row, column] += amount
+        self._counts[row, column] += count
+        if self._counts[row, column] <= 0:
+            self._totals[row, column] = 0.0
+            self._counts[row, column] = 0
+
+    def remove(self, month: str, category: str, amount: float):
+        self.add(month, category, -amount, -1)
+
+    def load(self, rows: List[Tuple[str, str, float, int]]):
+        """Bulk-add (month, category, total, count) rows, e.g. from ExpenseStore.monthly_totals()."""
+        if not rows:
+            return
+        numbers = [month_number(month) for month, _, _, _ in rows]
+        columns = [self._column(category) for _, category, _, _ in rows]
+        self._cover(min(numbers), max(numbers))
+        for number, column, (_, _, total, count) in zip(numbers, columns, rows):
+            self._totals[number - self._first, column] += total
+            self._counts[number - self._first, column] += count
+
+    def add_many(self, months: np.ndarray, categories: List[str], amounts: np.ndarray):
+        # months as datetime64[M] (or anything numpy can cast to it)
+        numbers = np.asarray(months, dtype="datetime64[M]").astype(np.int64)
+        if not len(numbers):
+            return
+        names, inverse = np.unique(np.asarray(categories, dtype=str), return_inverse=True)
+        columns = np.array([self._column(str(name)) for name in names], dtype=np.int64)[inverse]
+        self._cover(int(numbers.min()), int(numbers.max()))
+        cells = (numbers - self._first) * len(self.categories) + columns
+        size = self._totals.size
+        self._totals += np.bincount(cells, weights=np.asarray(amounts, dtype=np.float64),
+                                    minlength=size).reshape(self._totals.shape)
+        self._counts += np.bincount(cells, minlength=size).reshape(self._counts.shape)
+
+    def total(self, month: str, category: str = None) -> float:
+        """One month's total for a category, or across categories when category is None."""
+        if self._first is None:
+            return 0.0
+        row = month_number(month) - self._first
+        if not 0 <= row < len(self):
+            return 0.0
+        if category is None:
+            return float(self._totals[row].sum())
+        column = self._columns.get(category)
+        return 0.0 if column is None else float(self._totals[row, column])
+
+    def month_totals(self, month: str) -> Dict[str, Tuple[float, int]]:
+        """{category: (total, count)} for one month's categories that have expenses."""
+        row = -1 if self._first is None else month_number(month) - self._first
+        if not 0 <= row < len(self):
+            return {}
+        return {self.categories[column]: (float(self._totals[row, column]), int(self._counts[row, column]))
+                for column in np.flatnonzero(self._counts[row])}
+
+    def rows(self) -> List[Tuple[str, str, float, int]]:
+        """(month, category, total, count) for every cell with expenses; the inverse of load()."""
+        months, columns = np.nonzero(self._counts)
+        return [(month_label(self._first + int(row)), self.categories[column], float(self._totals[row, column]),
+                 int(self._counts[row, column])) for row, column in zip(months, columns)]
+
+    def window(self, end_month: str, months: int) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """Totals and counts for the `months` months ending at end_month, zero-filled."""
+        end = month_number(end_month)
+        start = end - months + 1
+        totals = np.zeros((months, len(self.categories)))
+        counts = np.zeros((months, len(self.categories)), dtype=np.int64)
+        if self._first is not None:
+            low = max(start, self._first)
+            high = min(end, self._first + len(self) - 1)
+            if low <= high:
+                totals[low - start:high - start + 1] = self._totals[low - self._first:high - self._first + 1]
+                counts[low - start:high - start + 1] = self._counts[low - self._first:high - self._first + 1]
+        return [month_label(n) for n in range(start, end + 1)], totals, counts
+
+    def trends(self, end_month: str, months: int = 12, category: str = None, rolling: int = 3) -> Dict:
+        # Fetch a year of history before the window so year-over-year and the
+        # rolling mean are defined from the first month shown
+        history = 12
+        labels, totals, _ = self.window(end_month, months + history)
+        if category is not None:
+            column = self._columns.get(category)
+            series = totals[:, column] if column is not None else np.zeros(len(labels))
+        else:
+            series = totals.sum(axis=1)
+
+        previous = series[history - 1:-1]
+        current = series[history:]
+        last_year = series[:months]
+        cumulative = np.concatenate([[0.0], np.cumsum(series)])
+        rolling_mean = (cumulative[history + 1:] - cumulative[history + 1 - rolling:-rolling]) / rolling
+
+        result = {
+            "months": labels[history:],
+            "category": category,
+            "totals": current.tolist(),
+            "month_over_month": (current - previous).tolist(),
+            "month_over_month_pct": _pct_change(current, previous),
+            "rolling_mean": rolling_mean.tolist(),
+            "year_over_year": (current - last_year).tolist(),
+            "year_over_year_pct": _pct_change(current, last_year),
+            "average": float(current.mean()) if months else 0.0,
+            "total": float(current.sum())
+        }
+        if category is None:
+            window = totals[history:]
+            result["by_category"] = {cat: window[:, i].tolist() for i, cat in enumerate(self.categories)
+                                     if window[:, i].any()}
+        return result
+
+
+def _pct_change(current: np.ndarray, base: np.ndarray) -> List:
+    # None where there is nothing to compare against
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = (current - base) / np.abs(base) * 100
+    return [None if b == 0 else float(p) for p, b in zip(pct, base)]
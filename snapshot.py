@@ -0,0 +1,118 @@
+import json
+import mmap
+import os
+import shutil
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List
+import numpy as np
+
+SNAPSHOT_VERSION = 1
+MANIFEST = "manifest.json"
+
+# Upgrades from an older manifest version to the next one, applied in
+# order on load so old snapshots keep opening. A new version that adds a
+# column registers a step here that fills in its default.
+UPGRADES: Dict[int, Callable[[Dict], Dict]] = {}
+
+
+class StringTable:
+    """Strings stored as one UTF-8 blob plus int64 offsets, decoded on access.
+
+    Strings appended after loading are kept in a plain list after the
+    mapped ones, so codes into the table stay stable.
+    """
+
+    def __init__(self, blob=b"", offsets: np.ndarray = None):
+        self._blob = blob
+        self._offsets = np.zeros(1, dtype=np.int64) if offsets is None else offsets
+        self._mapped = len(self._offsets) - 1
+        self._tail: List[str] = []
+
+    def __len__(self) -> int:
+        return self._mapped + len(self._tail)
+
+    def __getitem__(self, index: int) -> str:
+        index = int(index)
+        if index < 0:
+            index += len(self)
+        if index >= self._mapped:
+            return self._tail[index - self._mapped]
+        return self._blob[self._offsets[index]:self._offsets[index + 1]].decode("utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def append(self, value: str):
+        self._tail.append(value)
+
+
+def save_strings(directory: str, name: str, strings: Iterable[str]):
+    encoded = [value.encode("utf-8") for value in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    with open(os.path.join(directory, f"{name}.bin"), "wb") as f:
+        f.write(b"".join(encoded))
+    np.save(os.path.join(directory, f"{name}_offsets.npy"), offsets)
+
+
+def load_strings(directory: str, name: str) -> StringTable:
+    with open(os.path.join(directory, f"{name}.bin"), "rb") as f:
+        blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+    return StringTable(blob, np.load(os.path.join(directory, f"{name}_offsets.npy"), mmap_mode="r"))
+
+
+def save_column(directory: str, name: str, values: np.ndarray):
+    np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(values))
+
+
+def load_column(directory: str, name: str, rows: int, dtype) -> np.ndarray:
+    """Memory-map a column copy-on-write: pages are read on first touch, and
+    writes stay in this process instead of reaching the file."""
+    if not rows:
+        # Zero-length files cannot be mapped
+        return np.empty(0, dtype=dtype)
+    return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="c")
+
+
+def write_manifest(directory: str, kind: str, manifest: Dict):
+    # Written last: its presence marks a complete snapshot
+    with open(os.path.join(directory, MANIFEST), "w") as f:
+        json.dump({"version": SNAPSHOT_VERSION, "kind": kind, **manifest}, f)
+
+
+def read_manifest(directory: str, kind: str) -> Dict:
+    with open(os.path.join(directory, MANIFEST)) as f:
+        manifest = json.load(f)
+    if manifest.get("kind") != kind:
+        raise ValueError(f"{directory} is a '{manifest.get('kind')}' snapshot, not '{kind}'")
+    version = manifest.get("version", 1)
+    if version > SNAPSHOT_VERSION:
+        raise ValueError(f"Snapshot version {version} is newer than supported version {SNAPSHOT_VERSION}")
+    while version < SNAPSHOT_VERSION:
+        manifest = UPGRADES[version](manifest)
+        version += 1
+    manifest["version"] = version
+    return manifest
+
+
+@contextmanager
+def writing(path: str):
+    """Yield a scratch directory that replaces `path` once fully written.
+
+    Files of the snapshot being replaced are renamed away rather than
+    overwritten, so a process that still has them mapped keeps valid pages.
+    """
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    try:
+        yield tmp_path
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    old_path = f"{path}.old"
+    if os.path.exists(path):
+        shutil.rmtree(old_path, ignore_errors=True)
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
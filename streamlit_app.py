@@ -1,13 +1,12 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import json
 import random
 from chatbot import FinanceChatbot
 from intent_classifier import IntentClassifier
 from budget_advisor import BudgetAdvisor
+from model_registry import get_registry
 
 st.set_page_config(
     page_title="MoneyWise - Your Personal Finance Buddy",
@@ -215,6 +214,96 @@ def get_personal_greeting():
     else:
         return "Good evening! 🌙"
 
+ACTIVITY_PAGE_SIZE = 10
+
+CATEGORY_NAMES = {
+    'food_dining': '🍕 Food & Dining',
+    'transportation': '🚗 Transportation', 
+    'shopping': '🛍️ Shopping',
+    'entertainment': '🎬 Entertainment',
+    'utilities_bills': '⚡ Bills & Utilities',
+    'healthcare': '🏥 Healthcare',
+    'education': '📚 Education',
+    'travel': '✈️ Travel',
+    'other': '📦 Other'
+}
+
+def build_dashboard_data(advisor):
+    """Everything the dashboard derives from the ledger, computed in one go"""
+    summary = advisor.get_monthly_summary()
+    data = {
+        'summary': summary,
+        'budget_status': advisor.get_budget_status(),
+        'df_cat': None,
+        'fig_pie': None,
+        'fig_bar': None
+    }
+    
+    if summary['by_category']:
+        # plotly is only needed once there is something to chart
+        import plotly.express as px
+        import plotly.graph_objects as go
+        
+        df_cat = pd.DataFrame(list(summary['by_category'].items()), 
+                            columns=['Category', 'Amount'])
+        df_cat['Category'] = df_cat['Category'].map(CATEGORY_NAMES).fillna(df_cat['Category'])
+        
+        fig_pie = px.pie(df_cat, values='Amount', names='Category', 
+                       title="Where Your Money Goes",
+                       color_discrete_sequence=px.colors.qualitative.Set3)
+        fig_pie.update_layout(
+            font=dict(family="Inter, sans-serif", size=12),
+            title_font_size=16,
+            showlegend=True
+        )
+        
+        budget_data = []
+        for category, budget_amount in advisor.budgets.items():
+            spent = summary['by_category'].get(category, 0)
+            pretty_name = CATEGORY_NAMES.get(category, category)
+            budget_data.append({
+                'Category': pretty_name,
+                'Budget': budget_amount,
+                'Spent': spent,
+                'Remaining': max(0, budget_amount - spent)
+            })
+        
+        df_budget = pd.DataFrame(budget_data)
+        
+        fig_bar = go.Figure()
+        fig_bar.add_trace(go.Bar(
+            name='💰 Budget', 
+            x=df_budget['Category'], 
+            y=df_budget['Budget'],
+            marker_color='rgba(102, 126, 234, 0.7)'
+        ))
+        fig_bar.add_trace(go.Bar(
+            name='💸 Spent', 
+            x=df_budget['Category'], 
+            y=df_budget['Spent'],
+            marker_color='rgba(239, 68, 68, 0.8)'
+        ))
+        fig_bar.update_layout(
+            title="Budget vs Reality Check",
+            barmode='group',
+            font=dict(family="Inter, sans-serif"),
+            title_font_size=16,
+            xaxis_tickangle=-45
+        )
+        
+        data.update(df_cat=df_cat, fig_pie=fig_pie, fig_bar=fig_bar)
+    
+    return data
+
+def get_dashboard_data(advisor):
+    """Rebuild only when the ledger version (or the month) has moved on"""
+    key = (advisor.version, datetime.now().strftime("%Y-%m"))
+    cached = st.session_state.get('dashboard_cache')
+    if cached is None or cached[0] != key:
+        cached = (key, build_dashboard_data(advisor))
+        st.session_state.dashboard_cache = cached
+    return cached[1]
+
 st.markdown(f"""
 <div class="finance-header">
     <h1>💰 MoneyWise</h1>
@@ -225,9 +314,9 @@ st.markdown(f"""
 with st.sidebar:
     st.markdown("### 📊 Your Money Dashboard")
     
-    summary = st.session_state.chatbot.advisor.get_monthly_summary()
-    budget_status = st.session_state.chatbot.advisor.get_budget_status()
-    overall_status = budget_status.get('overall', {})
+    dashboard = get_dashboard_data(st.session_state.chatbot.advisor)
+    summary = dashboard['summary']
+    overall_status = dashboard['budget_status'].get('overall', {})
     
     if not st.session_state.user_name:
         name = st.text_input("What should I call you?", placeholder="Your name here...")
@@ -287,6 +376,20 @@ with st.sidebar:
         response = st.session_state.chatbot.process_message("show my budget")
         st.code(response, language=None)
 
+    with st.expander("⚙️ Model Status"):
+        registry_stats = get_registry().stats()
+        st.caption(f"Sessions attached: {registry_stats['sessions']}")
+        st.caption(f"Model memory: {registry_stats['model_memory_bytes'] / 2**20:,.0f} MB")
+        st.caption(f"Process memory: {registry_stats['process_rss_bytes'] / 2**20:,.0f} MB")
+        classifier = st.session_state.chatbot.classifier
+        st.caption(f"Answered without the model: {classifier.rule_hit_rate():.0%} "
+                   f"({classifier.stats['model_calls']} model calls)")
+        cache_stats = classifier.category_cache.stats()
+        st.caption(f"Category cache: {cache_stats['size']} entries, {cache_stats['hit_rate']:.0%} hit rate")
+        for stage in classifier.cascade_stats():
+            st.caption(f"Cascade {stage['model']}: {stage['accept_rate']:.0%} answered "
+                       f"of {stage['sequences']} ({stage['calls']} calls)")
+
 col1, col2 = st.columns([2, 1])
 
 with col1:
@@ -314,74 +417,13 @@ with col1:
 with col2:
     st.markdown("### 📈 Visual Insights")
     
-    summary = st.session_state.chatbot.advisor.get_monthly_summary()
-    
-    if summary['by_category']:
-        df_cat = pd.DataFrame(list(summary['by_category'].items()), 
-                            columns=['Category', 'Amount'])
-        
-        category_names = {
-            'food_dining': '🍕 Food & Dining',
-            'transportation': '🚗 Transportation', 
-            'shopping': '🛍️ Shopping',
-            'entertainment': '🎬 Entertainment',
-            'utilities_bills': '⚡ Bills & Utilities',
-            'healthcare': '🏥 Healthcare',
-            'education': '📚 Education',
-            'travel': '✈️ Travel',
-            'other': '📦 Other'
-        }
-        
-        df_cat['Category'] = df_cat['Category'].map(category_names).fillna(df_cat['Category'])
-        
+    if dashboard['fig_pie'] is not None:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        
-        fig_pie = px.pie(df_cat, values='Amount', names='Category', 
-                       title="Where Your Money Goes",
-                       color_discrete_sequence=px.colors.qualitative.Set3)
-        fig_pie.update_layout(
-            font=dict(family="Inter, sans-serif", size=12),
-            title_font_size=16,
-            showlegend=True
-        )
-        st.plotly_chart(fig_pie, use_container_width=True)
+        st.plotly_chart(dashboard['fig_pie'], use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
         
-        budget_data = []
-        for category, budget_amount in st.session_state.chatbot.advisor.budgets.items():
-            spent = summary['by_category'].get(category, 0)
-            pretty_name = category_names.get(category, category)
-            budget_data.append({
-                'Category': pretty_name,
-                'Budget': budget_amount,
-                'Spent': spent,
-                'Remaining': max(0, budget_amount - spent)
-            })
-        
-        df_budget = pd.DataFrame(budget_data)
-        
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        fig_bar = go.Figure()
-        fig_bar.add_trace(go.Bar(
-            name='💰 Budget', 
-            x=df_budget['Category'], 
-            y=df_budget['Budget'],
-            marker_color='rgba(102, 126, 234, 0.7)'
-        ))
-        fig_bar.add_trace(go.Bar(
-            name='💸 Spent', 
-            x=df_budget['Category'], 
-            y=df_budget['Spent'],
-            marker_color='rgba(239, 68, 68, 0.8)'
-        ))
-        fig_bar.update_layout(
-            title="Budget vs Reality Check",
-            barmode='group',
-            font=dict(family="Inter, sans-serif"),
-            title_font_size=16,
-            xaxis_tickangle=-45
-        )
-        st.plotly_chart(fig_bar, use_container_width=True)
+        st.plotly_chart(dashboard['fig_bar'], use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
     else:
         st.markdown("""
@@ -391,20 +433,37 @@ with col2:
         """, unsafe_allow_html=True)
 
 st.markdown("### 📋 Recent Activity")
-expenses_df = st.session_state.chatbot.advisor.get_expenses_df()
-if not expenses_df.empty:
-    recent_df = expenses_df.tail(10)[['date', 'description', 'category', 'amount']].copy()
-    recent_df['date'] = recent_df['date'].dt.strftime('%m/%d %H:%M')
-    
-    recent_df.columns = ['Date', 'What you bought', 'Category', 'Amount']
-    recent_df['Amount'] = recent_df['Amount'].apply(lambda x: f"${x:.2f}")
-    recent_df = recent_df.sort_values('Date', ascending=False)
+advisor = st.session_state.chatbot.advisor
+if st.session_state.get('activity_version') != advisor.version:
+    # Ledger changed: jump back to the newest page
+    st.session_state.activity_version = advisor.version
+    st.session_state.activity_cursors = [None]
+
+page_cursor = st.session_state.activity_cursors[-1]
+recent_expenses, next_cursor = advisor.get_expenses_page(ACTIVITY_PAGE_SIZE, page_cursor)
+if recent_expenses:
+    recent_df = pd.DataFrame([{
+        'Date': expense['date'].strftime('%Y-%m-%d %H:%M'),
+        'What you bought': expense['description'],
+        'Category': expense['category'],
+        'Amount': f"${expense['amount']:.2f}"
+    } for expense in recent_expenses])
     
     st.dataframe(
         recent_df, 
         use_container_width=True,
         hide_index=True
     )
+    
+    newer_col, older_col = st.columns(2)
+    with newer_col:
+        if len(st.session_state.activity_cursors) > 1 and st.button("⬅️ Newer", use_container_width=True):
+            st.session_state.activity_cursors.pop()
+            st.rerun()
+    with older_col:
+        if next_cursor is not None and st.button("Older ➡️", use_container_width=True):
+            st.session_state.activity_cursors.append(next_cursor)
+            st.rerun()
 else:
     st.info("🎯 No transactions yet. Let's start tracking your spending journey!")
 
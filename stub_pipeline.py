@@ -0,0 +1,46 @@
+import hashlib
+import math
+import re
+import time
+from typing import Dict, List
+
+WORD = re.compile(r'[a-z]+')
+
+
+class StubZeroShotPipeline:
+    """Deterministic stand-in for the zero-shot pipeline, for tests and offline benchmarks.
+
+    Labels whose words (split on "_") appear in the text score highest; a
+    hash of (text, label) breaks ties, so the same input always gets the
+    same ranking without downloading any weights.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def _score(self, sequence: str, labels: List[str]) -> Dict:
+        words = set(WORD.findall(sequence.lower()))
+        logits = []
+        for label in labels:
+            overlap = sum(1 for part in label.split("_") if part in words)
+            digest = hashlib.md5(f"{sequence}\x00{label}".encode("utf-8")).digest()
+            logits.append(2.0 * overlap + digest[0] / 255.0)
+
+        peak = max(logits)
+        weights = [math.exp(logit - peak) for logit in logits]
+        total = sum(weights)
+        order = sorted(range(len(labels)), key=lambda i: logits[i], reverse=True)
+        return {
+            "sequence": sequence,
+            "labels": [labels[i] for i in order],
+            "scores": [weights[i] / total for i in order]
+        }
+
+    def __call__(self, sequences, candidate_labels: List[str], batch_size: int = None, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if isinstance(sequences, str):
+            return self._score(sequences, candidate_labels)
+        return [self._score(sequence, candidate_labels) for sequence in sequences]